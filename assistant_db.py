@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+from datetime import datetime
+
+UPDATE_ASSISTANT_SQL = (
+    "UPDATE assistant_configuration "
+    "SET ivr_stt_array = {p}, path_finder_json = {p}, updatedOn = {p} "
+    "WHERE assistant_id = {p}"
+)
+
+def compact_json(value):
+    """Serialize a JSON column value without indentation"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+def connect_mysql(db_config):
+    """
+    Open a MySQL connection with PyMySQL, falling back to mysql-connector-python.
+    FOUND_ROWS makes rowcount report matched rather than changed rows, so re-writing
+    identical values still counts the assistant as found.
+    """
+    try:
+        import pymysql
+        from pymysql.constants import CLIENT
+        return pymysql.connect(
+            host=db_config['host'],
+            port=int(db_config['port']),
+            user=db_config['username'],
+            password=db_config['password'],
+            database=db_config['database'],
+            charset='utf8mb4',
+            autocommit=False,
+            client_flag=CLIENT.FOUND_ROWS
+        )
+    except ImportError:
+        pass
+
+    try:
+        import mysql.connector
+        from mysql.connector.constants import ClientFlag
+        return mysql.connector.connect(
+            host=db_config['host'],
+            port=int(db_config['port']),
+            user=db_config['username'],
+            password=db_config['password'],
+            database=db_config['database'],
+            charset='utf8mb4',
+            autocommit=False,
+            client_flags=[ClientFlag.FOUND_ROWS]
+        )
+    except ImportError:
+        raise RuntimeError("No MySQL driver available: install PyMySQL or mysql-connector-python")
+
+class AssistantConfigWriter:
+    """Writes ivr_stt_array/path_finder_json to assistant_configuration over one reused connection"""
+
+    def __init__(self, connection, placeholder='%s'):
+        self.connection = connection
+        self.update_sql = UPDATE_ASSISTANT_SQL.format(p=placeholder)
+
+    @classmethod
+    def for_mysql(cls, db_config):
+        return cls(connect_mysql(db_config), placeholder='%s')
+
+    @classmethod
+    def for_sqlite(cls, database_path):
+        return cls(sqlite3.connect(database_path), placeholder='?')
+
+    def update_assistants(self, updates):
+        """
+        Update many assistants in a single transaction.
+        updates: iterable of (assistant_id, ivr_stt_array, path_finder_json)
+        Returns {assistant_id: rows updated}; nothing is committed if any update fails.
+        """
+        updated_on = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows_updated = {}
+        cursor = self.connection.cursor()
+        try:
+            for assistant_id, ivr_stt_array, path_finder_json in updates:
+                cursor.execute(self.update_sql, (
+                    compact_json(ivr_stt_array),
+                    compact_json(path_finder_json),
+                    updated_on,
+                    assistant_id
+                ))
+                rows_updated[assistant_id] = cursor.rowcount
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        return rows_updated
+
+    def update_assistant(self, assistant_id, ivr_stt_array, path_finder_json):
+        """Update one assistant and return the number of rows updated"""
+        return self.update_assistants([(assistant_id, ivr_stt_array, path_finder_json)])[assistant_id]
+
+    def close(self):
+        self.connection.close()
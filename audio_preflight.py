@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import wave
+from array import array
+from collections import namedtuple
+
+# Rates the STT endpoint takes as-is; anything else is resampled to TARGET_SAMPLE_RATE
+# (override the silence settings with environment variables)
+ACCEPTED_SAMPLE_RATES = (8000, 16000)
+TARGET_SAMPLE_RATE = 16000
+SILENCE_THRESHOLD = int(os.environ.get('STT_SILENCE_THRESHOLD', '500'))
+SILENCE_PADDING_MS = int(os.environ.get('STT_SILENCE_PADDING_MS', '200'))
+SUPPORTED_SAMPLE_RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000)
+
+# audio_bytes is None when the file already matches and can be uploaded untouched
+PreflightResult = namedtuple('PreflightResult', ['audio_bytes', 'content_type', 'changes', 'header'])
+
+def stt_content_type(sample_rate):
+    return f'audio/wav; codecs=audio/pcm; samplerate={sample_rate}'
+
+class AudioPreflightError(Exception):
+    """Raised for audio the STT service would reject or that holds no speech"""
+
+def _read_samples(wav_reader):
+    """Return the frames of an open WAV file as signed 16-bit samples"""
+    sample_width = wav_reader.getsampwidth()
+    raw = wav_reader.readframes(wav_reader.getnframes())
+
+    if sample_width == 2:
+        samples = array('h', raw)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        return samples
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        return array('h', ((value - 128) << 8 for value in raw))
+    if sample_width == 4:
+        samples = array('i', raw)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+        return array('h', (value >> 16 for value in samples))
+    raise AudioPreflightError(f'Unsupported sample width: {sample_width * 8} bits')
+
+def _downmix(samples, channels):
+    if channels == 1:
+        return samples
+    interleaved = [samples[channel::channels] for channel in range(channels)]
+    return array('h', (sum(frame) // channels for frame in zip(*interleaved)))
+
+def _resample(samples, source_rate, target_rate):
+    """Linear-interpolation resample of mono samples"""
+    if source_rate == target_rate or not samples:
+        return samples
+    target_length = max(1, int(len(samples) * target_rate / source_rate))
+    step = source_rate / target_rate
+    last = len(samples) - 1
+    resampled = array('h', bytes(2 * target_length))
+    for index in range(target_length):
+        position = index * step
+        left = int(position)
+        if left >= last:
+            resampled[index] = samples[last]
+            continue
+        fraction = position - left
+        resampled[index] = int(samples[left] + (samples[left + 1] - samples[left]) * fraction)
+    return resampled
+
+def _trim_silence(samples, sample_rate, threshold=SILENCE_THRESHOLD, padding_ms=SILENCE_PADDING_MS):
+    """Drop leading and trailing samples quieter than threshold, keeping padding_ms around the speech"""
+    loud = lambda value: value > threshold or value < -threshold
+    start = next((index for index, value in enumerate(samples) if loud(value)), None)
+    if start is None:
+        return samples[:0]
+    end = len(samples) - next(index for index, value in enumerate(reversed(samples)) if loud(value))
+    padding = sample_rate * padding_ms // 1000
+    return samples[max(0, start - padding):min(len(samples), end + padding)]
+
+def preflight_wav(wav_file_path, target_rate=TARGET_SAMPLE_RATE, trim_silence=True):
+    """
+    Check a WAV file against what the STT endpoint accepts and normalize it for upload:
+    down-mix to mono 16-bit PCM, resample unaccepted rates to target_rate and trim
+    leading/trailing silence. The Content-Type reports the rate actually uploaded.
+    Returns a PreflightResult; raises AudioPreflightError for files not worth sending.
+    """
+    try:
+        with wave.open(wav_file_path, 'rb') as wav_reader:
+            header = {
+                'channels': wav_reader.getnchannels(),
+                'sample_width': wav_reader.getsampwidth(),
+                'sample_rate': wav_reader.getframerate(),
+                'frames': wav_reader.getnframes()
+            }
+            if header['frames'] == 0:
+                raise AudioPreflightError('WAV file has no audio frames')
+            if header['sample_rate'] not in SUPPORTED_SAMPLE_RATES:
+                raise AudioPreflightError(f"Unsupported sample rate: {header['sample_rate']} Hz")
+            samples = _read_samples(wav_reader)
+    except (wave.Error, EOFError) as e:
+        raise AudioPreflightError(f'Not a PCM WAV file: {e}')
+
+    changes = []
+    if header['channels'] != 1:
+        samples = _downmix(samples, header['channels'])
+        changes.append(f"downmixed {header['channels']} channels to mono")
+    if header['sample_width'] != 2:
+        changes.append(f"converted {header['sample_width'] * 8}-bit samples to 16-bit")
+    sample_rate = header['sample_rate']
+    if sample_rate not in ACCEPTED_SAMPLE_RATES:
+        samples = _resample(samples, sample_rate, target_rate)
+        changes.append(f"resampled {sample_rate} Hz to {target_rate} Hz")
+        sample_rate = target_rate
+
+    if trim_silence:
+        original_length = len(samples)
+        samples = _trim_silence(samples, sample_rate)
+        if not samples:
+            raise AudioPreflightError('WAV file contains only silence')
+        if len(samples) != original_length:
+            changes.append(f"trimmed {(original_length - len(samples)) * 1000 // sample_rate} ms of silence")
+
+    if not changes:
+        return PreflightResult(None, stt_content_type(sample_rate), changes, header)
+
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_writer:
+        wav_writer.setnchannels(1)
+        wav_writer.setsampwidth(2)
+        wav_writer.setframerate(sample_rate)
+        wav_writer.writeframes(samples.tobytes())
+    return PreflightResult(buffer.getvalue(), stt_content_type(sample_rate), changes, header)
@@ -5,36 +5,34 @@ import json
 import re
 import sys
 import os
-import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+from audio_preflight import AudioPreflightError, preflight_wav
+from language_overlay import normalize_language_mappings
+from route_table import build_route_table, build_transitions
+from stt_client import get_stt_client
+from transcription_cache import get_transcription_cache
+
 # Azure STT Configuration
 AZURE_STT_KEY = "7yAOU8Ce9WpRZnuBSBCKtnptzwRsgBwC41dZIFmKRSn34nc4A85xJQQJ99BIACF24PCXJ3w3AAAYACOGvMSy"
 AZURE_STT_REGION = "uaenorth"
-STT_URL = f"https://{AZURE_STT_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language=en-US&format=detailed"
+STT_LANGUAGE = "en-US"
+STT_FORMAT = "detailed"
+STT_URL = f"https://{AZURE_STT_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language={STT_LANGUAGE}&format={STT_FORMAT}"
+
+# Number of STT requests allowed in flight at once
+STT_MAX_WORKERS = int(os.environ.get('STT_MAX_WORKERS', '8'))
 
 def test_azure_stt_connection():
-    """Test Azure STT API connection"""
-    try:
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Testing Azure STT API connection...", file=sys.stderr)
-        
-        # Test with a simple curl command to check API availability
-        test_cmd = [
-            'curl', '-s', '-w', '%{http_code}',
-            '-X', 'POST', STT_URL,
-            '-H', f'Ocp-Apim-Subscription-Key: {AZURE_STT_KEY}',
-            '-H', f'Ocp-Apim-Subscription-Region: {AZURE_STT_REGION}',
-            '-H', 'Accept: application/json'
-        ]
-        
-        result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=10)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Test curl return code: {result.returncode}", file=sys.stderr)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Test response: {result.stdout[:200]}", file=sys.stderr)
-        
-        return True
-    except Exception as e:
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Azure STT test failed: {e}", file=sys.stderr)
+    """Probe the Azure STT endpoint over the pooled client (only run with --probe)"""
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Testing Azure STT API connection...", file=sys.stderr)
+    health = get_stt_client(STT_URL, AZURE_STT_KEY, AZURE_STT_REGION).probe()
+    if not health['reachable']:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Azure STT test failed: {health['error']}", file=sys.stderr)
         return False
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Test response status: {health['status_code']}", file=sys.stderr)
+    return True
 
 def robust_xml_parse(xml_string):
     """Robust XML parsing with multiple fallback strategies"""
@@ -46,7 +44,7 @@ def robust_xml_parse(xml_string):
         return None
 
 def transcribe_wav_with_curl(wav_file_path: str):
-    """Transcribe WAV file using Azure STT API"""
+    """Transcribe WAV file using Azure STT API over the pooled STT client"""
     local_file_path = wav_file_path
     
     # Check if file exists locally (on server)
@@ -59,75 +57,92 @@ def transcribe_wav_with_curl(wav_file_path: str):
             'confidence': 0
         }
     
+    # Reuse an earlier transcription of identical audio
+    cache = None
+    cache_key = None
+    try:
+        cache = get_transcription_cache()
+        if cache is not None:
+            cache_key = cache.key_for_file(local_file_path, STT_LANGUAGE, STT_FORMAT)
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: STT cache hit for {local_file_path}", file=sys.stderr)
+                return cached_result
+    except Exception as e:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: STT cache lookup failed: {e}", file=sys.stderr)
+        cache_key = None
+    
     try:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Transcribing WAV file: {local_file_path}", file=sys.stderr)
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: File size: {os.path.getsize(local_file_path)} bytes", file=sys.stderr)
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: STT URL: {STT_URL}", file=sys.stderr)
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Azure Key: {AZURE_STT_KEY[:10]}...", file=sys.stderr)
         
-        curl_cmd = [
-            'curl', '-s', '-w', '%{http_code}',
-            '-X', 'POST', STT_URL,
-            '-H', 'Content-Type: audio/wav; codecs=audio/pcm; samplerate=16000',
-            '-H', f'Ocp-Apim-Subscription-Key: {AZURE_STT_KEY}',
-            '-H', f'Ocp-Apim-Subscription-Region: {AZURE_STT_REGION}',
-            '-H', 'Accept: application/json',
-            '--data-binary', f'@{local_file_path}'
-        ]
-        
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Executing curl command...", file=sys.stderr)
-        result = subprocess.run(curl_cmd, capture_output=True, text=True)
-        
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Curl return code: {result.returncode}", file=sys.stderr)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Curl stdout length: {len(result.stdout)}", file=sys.stderr)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Curl stderr: {result.stderr}", file=sys.stderr)
+        # Normalize the audio and skip files the STT service would reject
+        try:
+            audio = preflight_wav(local_file_path)
+        except AudioPreflightError as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Audio preflight rejected {local_file_path}: {e}", file=sys.stderr)
+            return {
+                'status': 'error',
+                'error': f'Audio preflight failed: {e}',
+                'transcription': '',
+                'confidence': 0
+            }
+        if audio.changes:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Audio preflight: {', '.join(audio.changes)} ({len(audio.audio_bytes)} bytes to upload)", file=sys.stderr)
         
-        response_text = result.stdout.strip()
-        status_code = response_text[-3:] if response_text[-3:].isdigit() else 'unknown'
-        json_response = response_text[:-3] if status_code != 'unknown' else response_text
+        response = get_stt_client(STT_URL, AZURE_STT_KEY, AZURE_STT_REGION).recognize(
+            local_file_path, content_type=audio.content_type, audio_bytes=audio.audio_bytes
+        )
+        status_code = response.status_code
         
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Status code: {status_code}", file=sys.stderr)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: JSON response: {json_response[:200]}...", file=sys.stderr)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: JSON response: {response.body[:200]}...", file=sys.stderr)
         
-        if status_code == '200' and json_response:
-            try:
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Parsing JSON response...", file=sys.stderr)
-                stt_data = json.loads(json_response)
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Parsed STT data keys: {list(stt_data.keys())}", file=sys.stderr)
-                
-                transcription = stt_data.get('DisplayText', '')
-                confidence = stt_data.get('Confidence', 0)
-                
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Raw transcription: '{transcription}'", file=sys.stderr)
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Confidence: {confidence}", file=sys.stderr)
-                
-                if transcription:
-                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: STT completed - '{transcription}' (confidence: {confidence})", file=sys.stderr)
-                else:
-                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: Empty transcription received", file=sys.stderr)
-                
-                # No cleanup needed - using original file path
-                
-                return {
-                    'status': 'success',
-                    'transcription': transcription,
-                    'confidence': confidence,
-                    'raw_response': stt_data
-                }
-            except json.JSONDecodeError as e:
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: JSON parse error: {e}", file=sys.stderr)
-                return {
-                    'status': 'error',
-                    'error': f'JSON parse error: {e}',
-                    'transcription': '',
-                    'confidence': 0
-                }
+        if status_code == 200 and isinstance(response.data, dict):
+            stt_data = response.data
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Parsed STT data keys: {list(stt_data.keys())}", file=sys.stderr)
+            
+            transcription = stt_data.get('DisplayText', '')
+            confidence = stt_data.get('Confidence', 0)
+            
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Raw transcription: '{transcription}'", file=sys.stderr)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Confidence: {confidence}", file=sys.stderr)
+            
+            if transcription:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: STT completed - '{transcription}' (confidence: {confidence})", file=sys.stderr)
+            else:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: Empty transcription received", file=sys.stderr)
+            
+            # No cleanup needed - using original file path
+            
+            stt_result = {
+                'status': 'success',
+                'transcription': transcription,
+                'confidence': confidence,
+                'raw_response': stt_data
+            }
+            if cache_key is not None:
+                try:
+                    cache.put(cache_key, stt_result)
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: STT cache store failed: {e}", file=sys.stderr)
+            return stt_result
+        elif status_code == 200:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: JSON parse error: {response.body[:200]}", file=sys.stderr)
+            return {
+                'status': 'error',
+                'error': f'JSON parse error: {response.body[:200]}',
+                'transcription': '',
+                'confidence': 0
+            }
         else:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: STT request failed - Status: {status_code}", file=sys.stderr)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Full response: {response_text}", file=sys.stderr)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: Full response: {response.body}", file=sys.stderr)
             return {
                 'status': 'error',
-                'error': f'HTTP {status_code}: {json_response}',
+                'error': f'HTTP {status_code}: {response.body}',
                 'transcription': '',
                 'confidence': 0
             }
@@ -150,18 +165,83 @@ def clean_filename(filename):
             return filename[dash_index + 1:]
     return filename
 
-def extract_navigation_nodes(root):
-    """Extract Navigation nodes with WAV files and transcribe them"""
-    navigation_nodes = {}
+def transcribe_wav_files(wav_paths, max_workers=STT_MAX_WORKERS):
+    """Transcribe WAV files through a bounded worker pool, returning {path: stt_result}"""
+    unique_paths = list(dict.fromkeys(wav_paths))
+    results = {}
+    if not unique_paths:
+        return results
     
-    for mx_cell in root.findall('.//mxCell'):
-        if mx_cell.get('type') == 'Navigation':
-            cell_id = mx_cell.get('id')
-            cell_value = mx_cell.get('value', '')
-            
+    workers = max(1, min(max_workers, len(unique_paths)))
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Transcribing {len(unique_paths)} unique WAV files with {workers} workers", file=sys.stderr)
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_path = {executor.submit(transcribe_wav_with_curl, path): path for path in unique_paths}
+        for future in as_completed(future_to_path):
+            path = future_to_path[future]
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: STT worker failed for {path}: {e}", file=sys.stderr)
+                results[path] = {
+                    'status': 'error',
+                    'error': str(e),
+                    'transcription': '',
+                    'confidence': 0
+                }
+    
+    stt_client = get_stt_client(STT_URL, AZURE_STT_KEY, AZURE_STT_REGION)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: STT request stats: {stt_client.scheduler.stats()}", file=sys.stderr)
+    health = stt_client.health()
+    if health and not health['reachable']:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: Azure STT endpoint unreachable: {health['error']}", file=sys.stderr)
+    
+    return results
+
+def iterparse_mx_cells(xml_file):
+    """Yield mxCell elements from an XML file incrementally, freeing each one once it has been consumed"""
+    parents = []
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag == 'mxCell':
+            yield elem
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+def build_flow_model(mx_cells):
+    """Read mxCell elements once and collect the cells, edges, prompts and type counts every generator needs"""
+    cells = []
+    connections = {}
+    navigation_prompts = []
+    node_types = {}
+    
+    for mx_cell in mx_cells:
+        cell_id = mx_cell.get('id')
+        cell_type = mx_cell.get('type', 'Unknown')
+        cell_value = mx_cell.get('value', '')
+        
+        cells.append((cell_id or '', cell_type, cell_value))
+        node_types[cell_type] = node_types.get(cell_type, 0) + 1
+        
+        source = mx_cell.get('source')
+        target = mx_cell.get('target')
+        if source and target:
+            if source not in connections:
+                connections[source] = []
+            connections[source].append({
+                'target': target,
+                'label': cell_value,
+                'id': cell_id or ''
+            })
+        
+        if cell_type == 'Navigation':
             mx_params = mx_cell.find('mxParams')
             if mx_params is not None:
-                wav_files = []
+                prompts = []
                 
                 # Look for mxParam elements with promptfile attribute
                 for mx_param in mx_params.findall('mxParam'):
@@ -169,60 +249,166 @@ def extract_navigation_nodes(root):
                     if promptfile and '.wav' in promptfile:
                         # Clean the filename to remove number prefix
                         clean_name = clean_filename(promptfile.strip())
-                        
-                        # Transcribe the WAV file using the cleaned path
-                        stt_result = transcribe_wav_with_curl(clean_name)
-                        
-                        wav_files.append({
-                            'path': clean_name,  # Store the complete cleaned path
-                            'filename': clean_name.split('/')[-1] if '/' in clean_name else clean_name,
-                            'original_promptfile': promptfile.strip(),  # Keep original for reference
-                            'is_voice_prompt': '_VOICEPROMPT' in clean_name,
-                            'transcription': stt_result.get('transcription', ''),
-                            'confidence': stt_result.get('confidence', 0),
-                            'stt_status': stt_result.get('status', 'error')
-                        })
+                        prompts.append((promptfile.strip(), clean_name))
                 
-                if wav_files:
-                    navigation_nodes[cell_id] = {
-                        'id': cell_id,
-                        'value': cell_value,
-                        'wav_files': wav_files
-                    }
+                if prompts:
+                    navigation_prompts.append((cell_id, cell_value, prompts))
     
-    return navigation_nodes
+    return {
+        'cells': cells,
+        'connections': connections,
+        'navigation_prompts': navigation_prompts,
+        'node_types': node_types
+    }
 
-def extract_connections(root):
-    """Extract connections between nodes"""
-    connections = {}
+def analyze_reachability(flow_model):
+    """
+    Walk the flow from its Start nodes and report which cells a caller can reach.
+    Returns reachable node ids (None when the flow has no Start node), unreachable and
+    orphaned (edge-less) nodes, and the back edges that close reachable cycles, as [source, target].
+    """
+    connections = flow_model['connections']
+    edge_ids = {conn['id'] for conns in connections.values() for conn in conns}
+    node_ids = [cell_id for cell_id, cell_type, _ in flow_model['cells'] if cell_id not in edge_ids and cell_type != 'Unknown']
+    start_ids = [cell_id for cell_id, cell_type, _ in flow_model['cells'] if cell_type == 'Start']
+    if not start_ids:
+        return {'reachable': None, 'unreachable': [], 'orphans': [], 'cycles': []}
     
-    for mx_cell in root.findall('.//mxCell'):
-        source = mx_cell.get('source')
-        target = mx_cell.get('target')
-        
-        if source and target:
-            if source not in connections:
-                connections[source] = []
-            connections[source].append({
-                'target': target,
-                'label': mx_cell.get('value', ''),
-                'id': mx_cell.get('id', '')
+    has_incoming = {conn['target'] for conns in connections.values() for conn in conns}
+    orphans = [node_id for node_id in node_ids if node_id not in connections and node_id not in has_incoming]
+    
+    # Iterative DFS: every node it enters is reachable, and an edge back onto the current path closes a cycle
+    reachable = set()
+    on_path = set()
+    cycles = []
+    for start_id in start_ids:
+        if start_id in reachable:
+            continue
+        reachable.add(start_id)
+        on_path.add(start_id)
+        stack = [(start_id, iter(connections.get(start_id, [])))]
+        while stack:
+            node_id, children = stack[-1]
+            conn = next(children, None)
+            if conn is None:
+                stack.pop()
+                on_path.discard(node_id)
+                continue
+            target_id = conn['target']
+            if target_id in on_path:
+                cycles.append([node_id, target_id])
+            elif target_id not in reachable:
+                reachable.add(target_id)
+                on_path.add(target_id)
+                stack.append((target_id, iter(connections.get(target_id, []))))
+    
+    return {
+        'reachable': reachable,
+        'unreachable': [node_id for node_id in node_ids if node_id not in reachable],
+        'orphans': orphans,
+        'cycles': cycles
+    }
+
+# STT result used for the prompts of Navigation nodes no Start node reaches
+SKIPPED_UNREACHABLE_RESULT = {'status': 'skipped_unreachable', 'transcription': '', 'confidence': 0}
+
+def prune_unreachable_prompts(flow_model, reachability):
+    """
+    Mark the prompts of Navigation nodes no Start node reaches so they are not transcribed.
+    The nodes stay in the output with empty transcriptions (unless a reachable node shares the
+    prompt); returns (flow_model, skipped prompts).
+    """
+    reachable = reachability['reachable']
+    if reachable is None:
+        return flow_model, []
+    
+    skipped = []
+    for cell_id, cell_value, prompts in flow_model['navigation_prompts']:
+        if cell_id not in reachable:
+            skipped.append({
+                'id': cell_id,
+                'value': cell_value,
+                'wav_files': [clean_name for _, clean_name in prompts]
             })
+    return dict(flow_model, skipped_navigation={node['id'] for node in skipped}), skipped
+
+def flow_prompt_paths(flow_model):
+    """Return the cleaned WAV paths of every Navigation prompt in a flow that needs transcribing"""
+    skipped_navigation = flow_model.get('skipped_navigation', ())
+    return [
+        clean_name for cell_id, _, prompts in flow_model['navigation_prompts'] if cell_id not in skipped_navigation
+        for _, clean_name in prompts
+    ]
+
+def extract_navigation_nodes(flow_model, max_workers=STT_MAX_WORKERS, stt_results=None):
+    """Transcribe the prompts of Navigation nodes with WAV files (or use already-transcribed stt_results)"""
+    navigation_prompts = flow_model['navigation_prompts']
+    
+    # Every prompt is known up front so the STT requests can run concurrently
+    if stt_results is None:
+        stt_results = transcribe_wav_files(flow_prompt_paths(flow_model), max_workers=max_workers)
+    
+    # Merge results back in document order
+    skipped_navigation = flow_model.get('skipped_navigation', ())
+    navigation_nodes = {}
+    for cell_id, cell_value, prompts in navigation_prompts:
+        wav_files = []
+        for original_promptfile, clean_name in prompts:
+            if cell_id in skipped_navigation:
+                # A prompt shared with a reachable node was transcribed anyway
+                stt_result = stt_results.get(clean_name, SKIPPED_UNREACHABLE_RESULT)
+            else:
+                stt_result = stt_results[clean_name]
+            wav_files.append({
+                'path': clean_name,  # Store the complete cleaned path
+                'filename': clean_name.split('/')[-1] if '/' in clean_name else clean_name,
+                'original_promptfile': original_promptfile,  # Keep original for reference
+                'is_voice_prompt': '_VOICEPROMPT' in clean_name,
+                'transcription': stt_result.get('transcription', ''),
+                'confidence': stt_result.get('confidence', 0),
+                'stt_status': stt_result.get('status', 'error')
+            })
+        
+        navigation_nodes[cell_id] = {
+            'id': cell_id,
+            'value': cell_value,
+            'wav_files': wav_files
+        }
     
-    return connections
+    return navigation_nodes
+
+def build_graph_index(flow_model):
+    """Index incoming edges and first parents in a single pass over the connections"""
+    incoming = {}
+    first_parent = {}
+    total_connections = 0
+    for source_id, conns in flow_model['connections'].items():
+        for conn in conns:
+            target_id = conn['target']
+            incoming.setdefault(target_id, []).append(source_id)
+            # connections preserves document order, so the first source seen is the first parent;
+            # a self-loop (e.g. '*' to repeat a menu) never makes a node its own parent
+            if target_id != source_id:
+                first_parent.setdefault(target_id, source_id)
+            total_connections += 1
+    
+    return {
+        'incoming': incoming,
+        'first_parent': first_parent,
+        'node_types': flow_model['node_types'],
+        'total_connections': total_connections
+    }
 
-def generate_ivr_stt_array(root, navigation_nodes, connections):
+def generate_ivr_stt_array(flow_model, navigation_nodes, graph_index=None):
     """Generate IVR STT Array in the required format with language mappings"""
     
-    # Extract all nodes for metadata
-    all_nodes = root.findall('.//mxCell')
-    node_types = {}
-    for node in all_nodes:
-        node_type = node.get('type', 'Unknown')
-        node_types[node_type] = node_types.get(node_type, 0) + 1
+    if graph_index is None:
+        graph_index = build_graph_index(flow_model)
     
-    # Count connections
-    total_connections = sum(len(conns) for conns in connections.values())
+    # Metadata comes straight from the flow model and graph index
+    connections = flow_model['connections']
+    node_types = graph_index['node_types']
+    total_connections = graph_index['total_connections']
     
     # Generate language mappings
     language_mappings = {
@@ -302,7 +488,7 @@ def generate_ivr_stt_array(root, navigation_nodes, connections):
     
     # Generate language selection
     language_selection = {
-        "choose_language": language_selection_node or list(navigation_nodes.keys())[0],
+        "choose_language": language_selection_node or next(iter(navigation_nodes), None),
         "setlanguage_children": language_selection_children
     }
     
@@ -310,7 +496,7 @@ def generate_ivr_stt_array(root, navigation_nodes, connections):
     ivr_stt_array = {
         "metadata": {
             "source_xml": "xml.xml",
-            "total_nodes": len(all_nodes),
+            "total_nodes": len(flow_model['cells']),
             "root_nodes": len(navigation_nodes),
             "total_connections": total_connections,
             "node_types": node_types
@@ -321,50 +507,31 @@ def generate_ivr_stt_array(root, navigation_nodes, connections):
     
     return ivr_stt_array
 
-def generate_path_finder_json(root, navigation_nodes, connections):
+def generate_path_finder_json(flow_model, navigation_nodes, graph_index=None):
     """Generate Path Finder JSON structure in the required format"""
     
-    # Extract all nodes for metadata
-    all_nodes = root.findall('.//mxCell')
-    node_types = {}
+    if graph_index is None:
+        graph_index = build_graph_index(flow_model)
+    
+    connections = flow_model['connections']
+    node_types = graph_index['node_types']
+    incoming = graph_index['incoming']
+    first_parent = graph_index['first_parent']
     root_nodes = []
     
     # Process all nodes
     nodes_array = []
-    for node in all_nodes:
-        node_id = node.get('id', '')
-        node_type = node.get('type', 'Unknown')
-        node_value = node.get('value', '')
-        
-        # Count node types
-        node_types[node_type] = node_types.get(node_type, 0) + 1
-        
-        # Determine if this is a root node (no incoming connections)
-        is_root = True
-        for source_id, conns in connections.items():
-            for conn in conns:
-                if conn['target'] == node_id:
-                    is_root = False
-                    break
-            if not is_root:
-                break
-        
-        if is_root and node_type != 'Unknown':
+    for node_id, node_type, node_value in flow_model['cells']:
+        # A root node has no incoming connections
+        if node_id not in incoming and node_type != 'Unknown':
             root_nodes.append(node_id)
         
         # Get children
         children = connections.get(node_id, [])
         children_ids = [conn['target'] for conn in children]
         
-        # Determine parent (first connection that targets this node)
-        parent = None
-        for source_id, conns in connections.items():
-            for conn in conns:
-                if conn['target'] == node_id:
-                    parent = source_id
-                    break
-            if parent:
-                break
+        # Parent is the source of the first connection that targets this node
+        parent = first_parent.get(node_id)
         
         # Determine if skippable (based on node type)
         is_skippable = node_type in ['Unknown', 'DTMF', 'Normal', 'Exit']
@@ -379,96 +546,202 @@ def generate_path_finder_json(root, navigation_nodes, connections):
             "children": children_ids,
             "parent": parent,
             "isSkippable": is_skippable,
-            "land_before": land_before
+            "land_before": land_before,
+            "transitions": build_transitions((conn['label'], conn['target']) for conn in children)
         }
         
         nodes_array.append(node_obj)
     
-    # Count total connections
-    total_connections = sum(len(conns) for conns in connections.values())
+    total_connections = graph_index['total_connections']
+    
+    # Resolve jumps to a node with one lookup instead of a graph walk per caller utterance
+    edges = {
+        source_id: [(conn['target'], conn['label']) for conn in conns]
+        for source_id, conns in connections.items()
+    }
+    route_table = build_route_table(nodes_array, edges)
     
     # Create the final structure
     path_finder = {
         "metadata": {
             "source_xml": "xml.xml",
-            "total_nodes": len(all_nodes),
+            "total_nodes": len(flow_model['cells']),
             "root_nodes": len(root_nodes),
             "total_connections": total_connections,
             "node_types": node_types
         },
-        "nodes": nodes_array
+        "nodes": nodes_array,
+        "route_table": route_table
     }
     
     return path_finder
 
+def generate_metadata(xml_file, navigation_nodes, total_nodes, reachability=None, skipped_prompts=None):
+    """Summarize a processed flow, its STT transcription counts and any reachability findings"""
+    successful_transcriptions = 0
+    failed_transcriptions = 0
+    skipped_transcriptions = 0
+    for node_data in navigation_nodes.values():
+        for wav_file in node_data['wav_files']:
+            if wav_file['stt_status'] == 'success':
+                successful_transcriptions += 1
+            elif wav_file['stt_status'] == SKIPPED_UNREACHABLE_RESULT['status']:
+                skipped_transcriptions += 1
+            else:
+                failed_transcriptions += 1
+    
+    metadata = {
+        'source_file': xml_file,
+        'total_wav_files': successful_transcriptions + failed_transcriptions + skipped_transcriptions,
+        'total_nodes': total_nodes,
+        'navigation_nodes': len(navigation_nodes),
+        'successful_stt_transcriptions': successful_transcriptions,
+        'failed_stt_transcriptions': failed_transcriptions,
+        'total_transcriptions': successful_transcriptions + failed_transcriptions,
+        'generated_at': datetime.now().isoformat()
+    }
+    if reachability is not None and reachability['reachable'] is not None:
+        metadata['skipped_unreachable_prompts'] = skipped_transcriptions
+        metadata['unreachable_prompts'] = skipped_prompts or []
+        metadata['unreachable_nodes'] = reachability['unreachable']
+        metadata['orphan_nodes'] = reachability['orphans']
+        metadata['cycles'] = reachability['cycles']
+    
+    return metadata
+
+def write_stats_file(stats_file, stats):
+    """Write run statistics as key=value lines that a shell can read without a JSON parser"""
+    with open(stats_file, 'w', encoding='utf-8') as f:
+        for key, value in stats.items():
+            f.write(f"{key}={value}\n")
+
+class StreamingJSONWriter:
+    """Write a top-level JSON object to a stream one section at a time"""
+    
+    def __init__(self, stream, compact=False):
+        self.stream = stream
+        self.compact = compact
+        if compact:
+            self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        else:
+            self.encoder = json.JSONEncoder(ensure_ascii=False, indent=2)
+        self._sections_written = 0
+    
+    def begin(self):
+        self.stream.write('{')
+    
+    def write_section(self, key, value):
+        """Encode one key/value pair straight to the stream without building the whole string"""
+        separator = ',' if self._sections_written else ''
+        if self.compact:
+            self.stream.write(f'{separator}{json.dumps(key, ensure_ascii=False)}:')
+            for chunk in self.encoder.iterencode(value):
+                self.stream.write(chunk)
+        else:
+            self.stream.write(f'{separator}\n  {json.dumps(key, ensure_ascii=False)}: ')
+            # Nest the section one level deeper; encoded strings never contain raw newlines
+            for chunk in self.encoder.iterencode(value):
+                self.stream.write(chunk.replace('\n', '\n  '))
+        self._sections_written += 1
+    
+    def end(self):
+        self.stream.write('}\n' if self.compact else '\n}\n')
+        self.stream.flush()
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 automated_processor.py <xml_file>")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    if len(args) != 1:
+        print("Usage: python3 automated_processor.py <xml_file> [--stream] [--compact] [--probe] [--include-unreachable] [--language-overlay] [--stats-file=<path>]")
         sys.exit(1)
     
-    xml_file = sys.argv[1]
+    xml_file = args[0]
+    streaming = '--stream' in flags
+    compact = '--compact' in flags
+    probe = '--probe' in flags
+    include_unreachable = '--include-unreachable' in flags
+    language_overlay = '--language-overlay' in flags
+    stats_file = next((flag.split('=', 1)[1] for flag in flags if flag.startswith('--stats-file=')), None)
     
     try:
-        # Test Azure STT connection first
-        if not test_azure_stt_connection():
+        # The endpoint is otherwise checked lazily by the first real STT request
+        if probe and not test_azure_stt_connection():
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: Azure STT connection test failed, but continuing...", file=sys.stderr)
         
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Reading XML file: {xml_file}", file=sys.stderr)
-        
-        with open(xml_file, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
-        
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: XML file read successfully ({len(xml_content)} characters)", file=sys.stderr)
-        
-        root = robust_xml_parse(xml_content)
-        if root is None:
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Failed to parse XML", file=sys.stderr)
-            sys.exit(1)
-        
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: XML parsed successfully", file=sys.stderr)
+        if streaming:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Streaming XML file: {xml_file}", file=sys.stderr)
+            try:
+                flow_model = build_flow_model(iterparse_mx_cells(xml_file))
+            except ET.ParseError as e:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: XML parsing failed: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: XML streamed successfully ({len(flow_model['cells'])} cells)", file=sys.stderr)
+        else:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Reading XML file: {xml_file}", file=sys.stderr)
+            
+            with open(xml_file, 'r', encoding='utf-8') as f:
+                xml_content = f.read()
+            
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: XML file read successfully ({len(xml_content)} characters)", file=sys.stderr)
+            
+            root = robust_xml_parse(xml_content)
+            if root is None:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: Failed to parse XML", file=sys.stderr)
+                sys.exit(1)
+            
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: XML parsed successfully", file=sys.stderr)
+            
+            # Walk the tree once, then let it go before the slow STT phase
+            flow_model = build_flow_model(root.iter('mxCell'))
+            del root, xml_content
+        
+        reachability = analyze_reachability(flow_model)
+        skipped_prompts = []
+        if reachability['reachable'] is None:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: No Start node found, transcribing every prompt", file=sys.stderr)
+        else:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: {len(reachability['unreachable'])} nodes unreachable from Start ({len(reachability['orphans'])} orphaned), {len(reachability['cycles'])} cycles", file=sys.stderr)
+            if not include_unreachable:
+                flow_model, skipped_prompts = prune_unreachable_prompts(flow_model, reachability)
+                if skipped_prompts:
+                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INFO: Skipping prompts of {len(skipped_prompts)} unreachable Navigation nodes: {[node['id'] for node in skipped_prompts]}", file=sys.stderr)
         
-        navigation_nodes = extract_navigation_nodes(root)
+        navigation_nodes = extract_navigation_nodes(flow_model)
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Found {len(navigation_nodes)} Navigation nodes with WAV files", file=sys.stderr)
         
-        connections = extract_connections(root)
-        total_connections = sum(len(conns) for conns in connections.values())
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Found {total_connections} connections", file=sys.stderr)
+        graph_index = build_graph_index(flow_model)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Found {graph_index['total_connections']} connections", file=sys.stderr)
+        
+        # Each section is written as soon as it is built and released before the next one
+        writer = StreamingJSONWriter(sys.stdout, compact=compact)
+        writer.begin()
         
-        ivr_stt_array = generate_ivr_stt_array(root, navigation_nodes, connections)
+        ivr_stt_array = generate_ivr_stt_array(flow_model, navigation_nodes, graph_index)
+        if language_overlay:
+            # One shared node table plus per-language differences instead of a full copy per language
+            ivr_stt_array = normalize_language_mappings(ivr_stt_array)
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Generated IVR STT Array with {len(navigation_nodes)} entries", file=sys.stderr)
+        writer.write_section('ivr_stt_array', ivr_stt_array)
+        del ivr_stt_array
         
-        path_finder_json = generate_path_finder_json(root, navigation_nodes, connections)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Generated Path Finder JSON with {len(path_finder_json['nodes'])} nodes", file=sys.stderr)
+        path_finder_json = generate_path_finder_json(flow_model, navigation_nodes, graph_index)
+        total_nodes = len(path_finder_json['nodes'])
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Generated Path Finder JSON with {total_nodes} nodes", file=sys.stderr)
+        writer.write_section('path_finder_json', path_finder_json)
+        del path_finder_json
         
-        # Count successful transcriptions
-        successful_transcriptions = 0
-        failed_transcriptions = 0
-        for node_data in navigation_nodes.values():
-            for wav_file in node_data['wav_files']:
-                if wav_file['stt_status'] == 'success':
-                    successful_transcriptions += 1
-                else:
-                    failed_transcriptions += 1
+        metadata = generate_metadata(xml_file, navigation_nodes, total_nodes, reachability, skipped_prompts)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: {metadata['successful_stt_transcriptions']} real STT transcriptions completed, {metadata['failed_stt_transcriptions']} failed", file=sys.stderr)
         
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: {successful_transcriptions} real STT transcriptions completed, {failed_transcriptions} failed", file=sys.stderr)
+        writer.write_section('metadata', metadata)
+        writer.end()
         
-        output = {
-            'ivr_stt_array': ivr_stt_array,
-            'path_finder_json': path_finder_json,
-            'metadata': {
-                'source_file': xml_file,
-                'total_wav_files': successful_transcriptions + failed_transcriptions,
-                'total_nodes': len(path_finder_json['nodes']),
-                'navigation_nodes': len(navigation_nodes),
-                'successful_stt_transcriptions': successful_transcriptions,
-                'failed_stt_transcriptions': failed_transcriptions,
-                'total_transcriptions': successful_transcriptions + failed_transcriptions,
-                'generated_at': datetime.now().isoformat()
-            }
-        }
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Output written successfully", file=sys.stderr)
         
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Output structure created successfully", file=sys.stderr)
-        print(json.dumps(output, indent=2, ensure_ascii=False))
+        if stats_file:
+            stats = {key: value for key, value in metadata.items() if not isinstance(value, list)}
+            write_stats_file(stats_file, dict(stats, total_connections=graph_index['total_connections']))
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SUCCESS: Run statistics written to {stats_file}", file=sys.stderr)
         
     except Exception as e:
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: {e}", file=sys.stderr)
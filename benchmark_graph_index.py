@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark build_graph_index and the two JSON generators (including the route table) on
+synthetic menu trees, to check that they scale linearly with the number of cells.
+Usage: python3 benchmark_graph_index.py [cell_count ...]   (default 100 1000 10000 100000)
+"""
+
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from automated_processor import build_flow_model, build_graph_index, generate_ivr_stt_array, generate_path_finder_json
+
+def synthetic_flow_xml(cell_count, fan_out=9):
+    """
+    A Start node followed by a tree of Navigation menus, each offering keys 1..fan_out.
+    A menu tree keeps paths short, like real flows, so the route table stays proportional to the cells.
+    """
+    navigation_count = max(1, (cell_count - 3) // 2)
+    parts = ['<BnGModel><root><mxCell id="0"/><mxCell id="1"/><mxCell id="2" type="Start" value=""/>']
+    for node_id in range(3, 3 + navigation_count):
+        parts.append(f'<mxCell id="{node_id}" type="Navigation" value="menu {node_id}"/>')
+    edge_id = 3 + navigation_count
+    parts.append(f'<mxCell id="{edge_id}" type="Normal" value="" source="2" target="3"/>')
+    for index in range(1, navigation_count):
+        parent_id = 3 + (index - 1) // fan_out
+        key = (index - 1) % fan_out + 1
+        edge_id += 1
+        parts.append(f'<mxCell id="{edge_id}" type="DTMF" value="{key}" source="{parent_id}" target="{3 + index}"/>')
+    parts.append('</root></BnGModel>')
+    return ''.join(parts)
+
+def benchmark(cell_count, repeat=3):
+    flow_model = build_flow_model(ET.fromstring(synthetic_flow_xml(cell_count)).iter('mxCell'))
+    # Prompts are not needed to time the graph work; every Navigation node gets an empty entry
+    navigation_nodes = {
+        cell_id: {'id': cell_id, 'value': cell_value, 'wav_files': []}
+        for cell_id, cell_type, cell_value in flow_model['cells'] if cell_type == 'Navigation'
+    }
+
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        graph_index = build_graph_index(flow_model)
+        generate_ivr_stt_array(flow_model, navigation_nodes, graph_index)
+        generate_path_finder_json(flow_model, navigation_nodes, graph_index)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(flow_model['cells']), best
+
+def main():
+    cell_counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000, 100000]
+    print(f"{'cells':>8}  {'time (ms)':>10}  {'us/cell':>8}")
+    for cell_count in cell_counts:
+        cells, elapsed = benchmark(cell_count)
+        print(f"{cells:>8}  {elapsed * 1000:>10.1f}  {elapsed * 1e6 / cells:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from assistant_db import AssistantConfigWriter
+from language_overlay import normalize_language_mappings
+from automated_processor import (
+    STT_MAX_WORKERS, StreamingJSONWriter, analyze_reachability, build_flow_model, build_graph_index,
+    extract_navigation_nodes, flow_prompt_paths, generate_ivr_stt_array, generate_metadata,
+    generate_path_finder_json, iterparse_mx_cells, prune_unreachable_prompts,
+    test_azure_stt_connection, transcribe_wav_files
+)
+from transcript_index import TranscriptIndex, index_path_for
+
+# Worker processes used to parse flows (override with environment variable)
+BULK_MAX_PROCESSES = int(os.environ.get('BULK_MAX_PROCESSES', str(os.cpu_count() or 1)))
+
+def log(level, message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {level}: {message}", file=sys.stderr)
+
+def load_bulk_jobs(source):
+    """
+    Return [(xml_file, assistant_id)] from a directory or a manifest file.
+    In a directory every <assistant_id>.xml or <assistant_id>_<name>.xml is taken;
+    a manifest has one "<xml_file>,<assistant_id>" pair per line (# starts a comment),
+    with relative paths resolved against the manifest's directory.
+    """
+    jobs = []
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if not filename.lower().endswith('.xml'):
+                continue
+            match = re.match(r'(\d+)(?:_|\.)', filename)
+            if not match:
+                log("WARNING", f"Skipping {filename}: name does not start with an assistant ID")
+                continue
+            jobs.append((os.path.join(source, filename), int(match.group(1))))
+        return jobs
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = [part.strip() for part in re.split(r'[,\s]+', line) if part.strip()]
+            if len(parts) != 2 or not parts[1].isdigit():
+                log("WARNING", f"Skipping manifest line {line_number}: expected <xml_file>,<assistant_id>")
+                continue
+            jobs.append((os.path.join(base_dir, parts[0]), int(parts[1])))
+    return jobs
+
+def parse_flow(xml_file):
+    """
+    Build the flow model of one XML file (runs in a worker process).
+    Malformed XML raises a ParseError, which is reported as a failure of that flow.
+    """
+    return build_flow_model(iterparse_mx_cells(xml_file))
+
+def output_path_for(xml_file, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(xml_file))[0] + '.ivr_stt.json')
+
+def process_bulk_jobs(jobs, output_dir, max_processes=BULK_MAX_PROCESSES, max_workers=STT_MAX_WORKERS,
+                      include_unreachable=False, language_overlay=False):
+    """
+    Parse every flow in a process pool, transcribe the reachable prompts of all flows together
+    through the shared STT client and cache, then write one output JSON per flow.
+    Returns (db_updates, failures) where db_updates holds (assistant_id, ivr_stt_array, path_finder_json).
+    """
+    failures = []
+    flow_models = {}
+
+    log("INFO", f"Parsing {len(jobs)} flows with {max(1, min(max_processes, len(jobs)))} processes")
+    with ProcessPoolExecutor(max_workers=max(1, min(max_processes, len(jobs)))) as executor:
+        xml_files = [xml_file for xml_file, _ in jobs]
+        futures = [executor.submit(parse_flow, xml_file) for xml_file in xml_files]
+        for (xml_file, assistant_id), future in zip(jobs, futures):
+            try:
+                flow_models[xml_file] = future.result()
+            except Exception as e:
+                log("ERROR", f"Failed to parse {xml_file}: {e}")
+                failures.append((xml_file, assistant_id, str(e)))
+
+    reachability = {}
+    skipped_prompts = {}
+    for xml_file, flow_model in flow_models.items():
+        reachability[xml_file] = analyze_reachability(flow_model)
+        skipped_prompts[xml_file] = []
+        if not include_unreachable:
+            flow_models[xml_file], skipped_prompts[xml_file] = prune_unreachable_prompts(flow_model, reachability[xml_file])
+            if skipped_prompts[xml_file]:
+                log("INFO", f"{xml_file}: skipping prompts of {len(skipped_prompts[xml_file])} unreachable Navigation nodes")
+
+    # Prompts shared between flows are only transcribed once
+    stt_results = transcribe_wav_files(
+        [path for flow_model in flow_models.values() for path in flow_prompt_paths(flow_model)],
+        max_workers=max_workers
+    )
+
+    os.makedirs(output_dir, exist_ok=True)
+    db_updates = []
+    for xml_file, assistant_id in jobs:
+        flow_model = flow_models.get(xml_file)
+        if flow_model is None:
+            continue
+        try:
+            navigation_nodes = extract_navigation_nodes(flow_model, stt_results=stt_results)
+            graph_index = build_graph_index(flow_model)
+            ivr_stt_array = generate_ivr_stt_array(flow_model, navigation_nodes, graph_index)
+            if language_overlay:
+                ivr_stt_array = normalize_language_mappings(ivr_stt_array)
+            path_finder_json = generate_path_finder_json(flow_model, navigation_nodes, graph_index)
+            metadata = generate_metadata(
+                xml_file, navigation_nodes, len(path_finder_json['nodes']),
+                reachability[xml_file], skipped_prompts[xml_file]
+            )
+
+            output_file = output_path_for(xml_file, output_dir)
+            with open(output_file, 'w', encoding='utf-8') as f:
+                writer = StreamingJSONWriter(f)
+                writer.begin()
+                writer.write_section('ivr_stt_array', ivr_stt_array)
+                writer.write_section('path_finder_json', path_finder_json)
+                writer.write_section('metadata', metadata)
+                writer.end()
+            TranscriptIndex.build(ivr_stt_array).save(index_path_for(output_file))
+
+            log("SUCCESS", f"Assistant {assistant_id}: {xml_file} -> {output_file} ({metadata['successful_stt_transcriptions']} transcribed, {metadata['failed_stt_transcriptions']} failed)")
+            db_updates.append((assistant_id, ivr_stt_array, path_finder_json))
+        except Exception as e:
+            log("ERROR", f"Failed to process {xml_file}: {e}")
+            failures.append((xml_file, assistant_id, str(e)))
+
+    return db_updates, failures
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    if len(args) != 1:
+        print("Usage: python3 bulk_processor.py <xml_directory|manifest_file> [--output-dir=<path>] [--execute-db] [--probe] [--include-unreachable] [--language-overlay]")
+        print("Example: python3 bulk_processor.py tenant_flows/ --output-dir=bulk_output --execute-db")
+        sys.exit(1)
+
+    source = args[0]
+    output_dir = next((flag.split('=', 1)[1] for flag in flags if flag.startswith('--output-dir=')), 'bulk_output')
+    execute_db = '--execute-db' in flags
+    probe = '--probe' in flags
+    include_unreachable = '--include-unreachable' in flags
+    language_overlay = '--language-overlay' in flags
+
+    # Database configuration
+    db_config = {
+        'host': '127.0.0.1',
+        'port': '3306',
+        'username': 'root',
+        'password': '',  # Empty password
+        'database': 'call_module'
+    }
+
+    jobs = load_bulk_jobs(source)
+    if not jobs:
+        log("ERROR", f"No (xml_file, assistant_id) pairs found in {source}")
+        sys.exit(1)
+    log("INFO", f"Loaded {len(jobs)} flows from {source}")
+
+    # The endpoint is otherwise checked lazily by the first real STT request
+    if probe and not test_azure_stt_connection():
+        log("WARNING", "Azure STT connection test failed, but continuing...")
+
+    db_updates, failures = process_bulk_jobs(
+        jobs, output_dir, include_unreachable=include_unreachable, language_overlay=language_overlay
+    )
+
+    if execute_db and db_updates:
+        try:
+            writer = AssistantConfigWriter.for_mysql(db_config)
+            try:
+                rows_updated = writer.update_assistants(db_updates)
+            finally:
+                writer.close()
+        except Exception as e:
+            log("ERROR", f"Batched database update failed, no assistants were updated: {e}")
+            sys.exit(1)
+        missing = [assistant_id for assistant_id, rows in rows_updated.items() if rows == 0]
+        log("SUCCESS", f"Updated {len(rows_updated) - len(missing)} assistants in one transaction")
+        if missing:
+            log("WARNING", f"No assistant_configuration row for assistant IDs: {missing}")
+
+    log("INFO", f"Processed {len(db_updates)}/{len(jobs)} flows, outputs in {output_dir}")
+    if failures:
+        for xml_file, assistant_id, error in failures:
+            log("ERROR", f"Assistant {assistant_id} ({xml_file}) failed: {error}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,7 @@ WAV_BASE_PATH="/data/filestore/services/template/"
 XML_FILE="${1:-xml.xml}"
 ASSISTANT_ID="${2:-1}"
 OUTPUT_FILE="ivr_stt_output.json"
+STATS_FILE="ivr_stt_output.stats"
 SQL_FILE="update_assistant_${ASSISTANT_ID}.sql"
 
 # Colors for output
@@ -162,7 +163,7 @@ log "INFO" "Using corrected Python processor"
 # Run the Python processor
 log "INFO" "Executing Python XML processor..."
 
-if python3 automated_processor.py "$XML_FILE" > "$OUTPUT_FILE" 2>/dev/null; then
+if python3 automated_processor.py "$XML_FILE" --stats-file="$STATS_FILE" > "$OUTPUT_FILE" 2>/dev/null; then
     log "SUCCESS" "Python processor executed successfully"
 else
     log "ERROR" "Python processor failed to execute"
@@ -176,36 +177,19 @@ if [ -f "$OUTPUT_FILE" ] && [ -s "$OUTPUT_FILE" ]; then
     file_size=$(wc -c < "$OUTPUT_FILE")
     log "INFO" "File size: $file_size bytes"
     
-    # Extract statistics
-    total_wav_files=$(python3 -c "
-import json
-try:
-    with open('$OUTPUT_FILE', 'r') as f:
-        data = json.load(f)
-    print(data['metadata']['total_wav_files'])
-except Exception as e:
-    print('N/A')
-" 2>/dev/null)
-    
-    successful_transcriptions=$(python3 -c "
-import json
-try:
-    with open('$OUTPUT_FILE', 'r') as f:
-        data = json.load(f)
-    print(data['metadata']['successful_transcriptions'])
-except Exception as e:
-    print('N/A')
-" 2>/dev/null)
-    
-    total_nodes=$(python3 -c "
-import json
-try:
-    with open('$OUTPUT_FILE', 'r') as f:
-        data = json.load(f)
-    print(data['metadata']['total_nodes'])
-except Exception as e:
-    print('N/A')
-" 2>/dev/null)
+    # Read statistics from the side-car summary written by the processor
+    total_wav_files="N/A"
+    successful_transcriptions="N/A"
+    total_nodes="N/A"
+    if [ -f "$STATS_FILE" ]; then
+        while IFS='=' read -r key value; do
+            case "$key" in
+                total_wav_files) total_wav_files="$value" ;;
+                successful_stt_transcriptions) successful_transcriptions="$value" ;;
+                total_nodes) total_nodes="$value" ;;
+            esac
+        done < "$STATS_FILE"
+    fi
     
     echo ""
     log "INFO" "Step 1 completed successfully"
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+from collections.abc import Mapping
+
+def is_overlay_format(ivr_stt_array):
+    return 'language_overlays' in ivr_stt_array
+
+def normalize_language_mappings(ivr_stt_array, base_language='default'):
+    """
+    Convert an ivr_stt_array with full per-language copies into the overlay format:
+    one shared node table (taken from base_language) plus, per language, only the nodes
+    and children that differ and the ids of shared nodes the language does not have.
+    """
+    if is_overlay_format(ivr_stt_array):
+        return ivr_stt_array
+
+    language_mappings = ivr_stt_array.get('language_mappings', {})
+    base = language_mappings.get(base_language) or next(iter(language_mappings.values()), {'nodes': {}, 'children': []})
+    shared_nodes = base.get('nodes', {})
+    shared_children = base.get('children', [])
+
+    overlays = {}
+    for lang, lang_data in language_mappings.items():
+        nodes = lang_data.get('nodes', {})
+        overlay = {}
+        changed_nodes = {node_id: node for node_id, node in nodes.items() if shared_nodes.get(node_id) != node}
+        if changed_nodes:
+            overlay['nodes'] = changed_nodes
+        removed = [node_id for node_id in shared_nodes if node_id not in nodes]
+        if removed:
+            overlay['removed'] = removed
+        if lang_data.get('children', []) != shared_children:
+            overlay['children'] = lang_data.get('children', [])
+        overlays[lang] = overlay
+
+    normalized = {}
+    for key, value in ivr_stt_array.items():
+        if key == 'language_mappings':
+            normalized['shared'] = {'nodes': shared_nodes, 'children': shared_children}
+            normalized['language_overlays'] = overlays
+        else:
+            normalized[key] = value
+    return normalized
+
+class OverlayNodes(Mapping):
+    """A language's node table: overlay nodes first, then the shared table minus removed ids"""
+
+    def __init__(self, shared_nodes, overlay_nodes, removed):
+        self._shared = shared_nodes
+        self._overlay = overlay_nodes
+        self._removed = frozenset(removed)
+
+    def __getitem__(self, node_id):
+        if node_id in self._overlay:
+            return self._overlay[node_id]
+        if node_id in self._removed:
+            raise KeyError(node_id)
+        return self._shared[node_id]
+
+    def __iter__(self):
+        for node_id in self._shared:
+            if node_id not in self._removed or node_id in self._overlay:
+                yield node_id
+        for node_id in self._overlay:
+            if node_id not in self._shared:
+                yield node_id
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+class LazyLanguageMappings(Mapping):
+    """language_mappings view over the overlay format; each language is assembled on first access"""
+
+    def __init__(self, ivr_stt_array):
+        self._shared = ivr_stt_array.get('shared', {})
+        self._overlays = ivr_stt_array['language_overlays']
+        self._expanded = {}
+
+    def __getitem__(self, lang):
+        mapping = self._expanded.get(lang)
+        if mapping is None:
+            overlay = self._overlays[lang]
+            mapping = self._expanded[lang] = {
+                'nodes': OverlayNodes(self._shared.get('nodes', {}), overlay.get('nodes', {}), overlay.get('removed', [])),
+                'children': overlay.get('children', self._shared.get('children', []))
+            }
+        return mapping
+
+    def __iter__(self):
+        return iter(self._overlays)
+
+    def __len__(self):
+        return len(self._overlays)
+
+def get_language_mappings(ivr_stt_array):
+    """Return {language: {'nodes', 'children'}} for either format, expanding overlays lazily"""
+    if is_overlay_format(ivr_stt_array):
+        return LazyLanguageMappings(ivr_stt_array)
+    return ivr_stt_array.get('language_mappings', {})
+
+def iter_stored_nodes(ivr_stt_array):
+    """
+    Yield (language, node_id, node_data) for every node object actually stored, so in-place
+    updates reach each copy exactly once; shared overlay nodes are reported under language None.
+    """
+    if is_overlay_format(ivr_stt_array):
+        for node_id, node_data in ivr_stt_array.get('shared', {}).get('nodes', {}).items():
+            yield None, node_id, node_data
+        for lang, overlay in ivr_stt_array['language_overlays'].items():
+            for node_id, node_data in overlay.get('nodes', {}).items():
+                yield lang, node_id, node_data
+        return
+    for lang, lang_data in ivr_stt_array.get('language_mappings', {}).items():
+        for node_id, node_data in lang_data.get('nodes', {}).items():
+            yield lang, node_id, node_data
+
+def stored_node_languages(ivr_stt_array, lang, node_id):
+    """
+    Return how many languages use the node stored under (lang, node_id) by iter_stored_nodes,
+    so per-language counts come out the same in both formats
+    """
+    if lang is not None or not is_overlay_format(ivr_stt_array):
+        return 1
+    return sum(
+        1 for overlay in ivr_stt_array['language_overlays'].values()
+        if node_id not in overlay.get('nodes', {}) and node_id not in overlay.get('removed', [])
+    )
+
+def expand_language_mappings(ivr_stt_array):
+    """Return an ivr_stt_array in the full per-language format (e.g. for consumers of the old layout)"""
+    if not is_overlay_format(ivr_stt_array):
+        return ivr_stt_array
+    language_mappings = {
+        lang: {'nodes': dict(mapping['nodes']), 'children': mapping['children']}
+        for lang, mapping in LazyLanguageMappings(ivr_stt_array).items()
+    }
+    expanded = {}
+    for key, value in ivr_stt_array.items():
+        if key == 'shared':
+            continue
+        if key == 'language_overlays':
+            expanded['language_mappings'] = language_mappings
+        else:
+            expanded[key] = value
+    return expanded
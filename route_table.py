@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+from collections import deque
+
+# Keys a caller can press; any other edge label ('any', 'success', '') is followed without input
+DTMF_KEYS = frozenset('0123456789*#')
+
+def dtmf_presses(label):
+    """Return the number of key presses an edge label needs (0 for automatic transitions)"""
+    if label and all(key in DTMF_KEYS for key in label):
+        return len(label)
+    return 0
+
+# Transition key for edges taken on any input (also used for unlabelled edges)
+WILDCARD = 'any'
+
+def build_transitions(edges):
+    """
+    Build a node's {input -> target_id} map from its (label, target_id) edges in document order.
+    Unlabelled edges fall under the wildcard, the first edge wins for a repeated label and
+    self-loops (e.g. '*' to repeat a menu) map back to the node itself.
+    """
+    transitions = {}
+    for label, target_id in edges:
+        transitions.setdefault(label or WILDCARD, target_id)
+    return transitions
+
+def next_node(transitions, key):
+    """Return the target for a pressed key, falling back to the wildcard, or None"""
+    target_id = transitions.get(key)
+    if target_id is None:
+        target_id = transitions.get(WILDCARD)
+    return target_id
+
+def _shortest_dtmf_paths(entry_id, node_by_id, edges):
+    """
+    0-1 BFS from an entry point along the fewest key presses.
+    Returns {node_id: (previous_node_id, label)}, the label being the edge taken into the node.
+    """
+    presses = {entry_id: 0}
+    previous = {entry_id: (None, '')}
+    queue = deque([entry_id])
+    while queue:
+        node_id = queue.popleft()
+        if node_id not in node_by_id:
+            continue
+        for child_id, label in edges.get(node_id, ()):
+            weight = dtmf_presses(label)
+            cost = presses[node_id] + weight
+            if child_id in presses and presses[child_id] <= cost:
+                continue
+            presses[child_id] = cost
+            previous[child_id] = (node_id, label)
+            if weight:
+                queue.append(child_id)
+            else:
+                queue.appendleft(child_id)
+    return previous
+
+def _landing_node(path, node_by_id):
+    """Land on the target, or the node before it when land_before is set, skipping back over skippable nodes"""
+    position = len(path) - 1
+    if node_by_id[path[position]]['land_before'] and position > 0:
+        position -= 1
+    while position > 0 and node_by_id.get(path[position], {}).get('isSkippable'):
+        position -= 1
+    return path[position]
+
+def build_route_table(nodes, edges, target_types=('Navigation',)):
+    """
+    Precompute how to reach every node of target_types from each entry point (the Start nodes).
+    nodes are flat path-finder nodes (id, type, children, parent, isSkippable, land_before);
+    edges maps a source_id to its (target_id, label) edges, so several keys leading to the
+    same node are all considered and the cheapest one is used.
+    routes[target_id][entry_id] holds the keys to press, the node path and the node to land on.
+    """
+    node_by_id = {node['id']: node for node in nodes}
+    root_ids = [
+        node['id'] for node in nodes
+        if node['parent'] is None and node['children'] and node['type'] != 'Unknown'
+    ]
+    # Start nodes are the real entry points; other roots only count when a flow has none
+    entry_points = [node_id for node_id in root_ids if node_by_id[node_id]['type'] == 'Start'] or root_ids
+    targets = [node['id'] for node in nodes if node['type'] in target_types]
+
+    routes = {}
+    for entry_id in entry_points:
+        previous = _shortest_dtmf_paths(entry_id, node_by_id, edges)
+        for target_id in targets:
+            if target_id not in previous:
+                continue
+            path = [target_id]
+            labels = []
+            while previous[path[-1]][0] is not None:
+                previous_id, label = previous[path[-1]]
+                labels.append(label)
+                path.append(previous_id)
+            path.reverse()
+            labels.reverse()
+            routes.setdefault(target_id, {})[entry_id] = {
+                'dtmf': ''.join(label for label in labels if dtmf_presses(label)),
+                'path': path,
+                'land_on': _landing_node(path, node_by_id)
+            }
+
+    return {
+        'entry_points': entry_points,
+        'routes': routes
+    }
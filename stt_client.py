@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+import http.client
+import json
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Connection pool sizing and request timeout (override with environment variables)
+STT_POOL_SIZE = int(os.environ.get('STT_POOL_SIZE', '8'))
+STT_TIMEOUT = float(os.environ.get('STT_TIMEOUT', '60'))
+
+# Request pacing and retry policy (override with environment variables)
+STT_RATE_LIMIT = float(os.environ.get('STT_RATE_LIMIT', '10'))
+STT_MAX_CONCURRENCY = int(os.environ.get('STT_MAX_CONCURRENCY', '8'))
+STT_MAX_RETRIES = int(os.environ.get('STT_MAX_RETRIES', '4'))
+STT_BACKOFF_BASE = float(os.environ.get('STT_BACKOFF_BASE', '0.5'))
+STT_BACKOFF_MAX = float(os.environ.get('STT_BACKOFF_MAX', '30'))
+
+# Responses and exceptions worth retrying: throttling, transient server and network errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, socket.gaierror, http.client.HTTPException)
+
+# Read size used when streaming a WAV file into the request body
+UPLOAD_BLOCK_SIZE = 64 * 1024
+
+# Errors raised when a pooled keep-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+STTResponse = namedtuple('STTResponse', ['status_code', 'data', 'body', 'headers'])
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class STTScheduler:
+    """
+    Paces STT requests with an adaptive token bucket and a concurrency cap, and retries
+    throttled or failed requests with jittered exponential backoff that honours Retry-After.
+    The bucket rate halves on every 429 and creeps back up to the configured limit on success.
+    """
+
+    def __init__(self, rate_limit=STT_RATE_LIMIT, max_concurrency=STT_MAX_CONCURRENCY, max_retries=STT_MAX_RETRIES,
+                 backoff_base=STT_BACKOFF_BASE, backoff_max=STT_BACKOFF_MAX):
+        self.max_rate = rate_limit
+        self.min_rate = rate_limit / 16
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._rate = rate_limit
+        self._tokens = max(1.0, rate_limit)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats = {
+            'requests': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'retries': 0,
+            'throttled': 0,
+            'server_errors': 0,
+            'network_errors': 0,
+            'wait_seconds': 0.0
+        }
+
+    def _acquire_token(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(max(1.0, self._rate), self._tokens + (now - self._last_refill) * self._rate)
+                self._last_refill = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self._rate)
+                self._stats['wait_seconds'] += wait
+            time.sleep(wait)
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # Full jitter spreads retries from concurrent workers apart
+        delay = random.uniform(0, delay)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _record(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _on_throttled(self, retry_after):
+        with self._lock:
+            self._stats['throttled'] += 1
+            self._rate = max(self.min_rate, self._rate / 2)
+            if retry_after:
+                # Every worker holds off, not just the one that was throttled
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def _on_success(self):
+        with self._lock:
+            self._stats['succeeded'] += 1
+            self._rate = min(self.max_rate, self._rate + self.max_rate / 20)
+
+    def run(self, send):
+        """Call send() -> STTResponse under the rate limit, retrying retryable outcomes"""
+        attempt = 0
+        while True:
+            self._acquire_token()
+            self._record('requests')
+            try:
+                with self._slots:
+                    response = send()
+            except RETRYABLE_ERRORS:
+                self._record('network_errors')
+                if attempt >= self.max_retries:
+                    self._record('failed')
+                    raise
+                delay = self._backoff_delay(attempt)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if response.status_code == 200:
+                        self._on_success()
+                    else:
+                        self._record('failed')
+                    return response
+                retry_after = parse_retry_after(response.headers.get('retry-after'))
+                if response.status_code == 429:
+                    self._on_throttled(retry_after)
+                else:
+                    self._record('server_errors')
+                if attempt >= self.max_retries:
+                    self._record('failed')
+                    return response
+                delay = self._backoff_delay(attempt, retry_after)
+
+            attempt += 1
+            self._record('retries')
+            self._record('wait_seconds', delay)
+            time.sleep(delay)
+
+    def stats(self):
+        """Return a snapshot of the run statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['current_rate'] = round(self._rate, 3)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        return stats
+
+class STTClient:
+    """Azure STT client that keeps HTTP connections alive across requests"""
+
+    def __init__(self, url, key, region, pool_size=STT_POOL_SIZE, timeout=STT_TIMEOUT, scheduler=None):
+        parts = urlsplit(url)
+        self.scheduler = scheduler or STTScheduler()
+        self.url = url
+        self.key = key
+        self.region = region
+        self.timeout = timeout
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = parts.path + (f'?{parts.query}' if parts.query else '')
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._health = None
+        self._health_lock = threading.Lock()
+
+    def _new_connection(self):
+        connection_class = http.client.HTTPSConnection if self._scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self._host, self._port, timeout=self.timeout, blocksize=UPLOAD_BLOCK_SIZE)
+
+    def _acquire(self):
+        """Return (connection, reused) from the pool, opening a new one if it is empty"""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, connection):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _record_health(self, reachable, status_code=None, error=None, replace=False):
+        """Keep the first outcome seen by this process; a later response replaces an unreachable result"""
+        with self._health_lock:
+            if self._health is None or replace or (reachable and not self._health['reachable']):
+                self._health = {
+                    'reachable': reachable,
+                    'status_code': status_code,
+                    'error': error,
+                    'checked_at': time.time()
+                }
+
+    def health(self):
+        """Return the endpoint health observed by this process, or None before the first request"""
+        with self._health_lock:
+            return dict(self._health) if self._health else None
+
+    def probe(self):
+        """Send an empty request now (outside the scheduler) and return the refreshed health"""
+        try:
+            response = self._send(None, 'audio/wav; codecs=audio/pcm; samplerate=16000', audio_bytes=b'')
+        except Exception as e:
+            self._record_health(False, error=str(e), replace=True)
+        else:
+            self._record_health(True, status_code=response.status_code, replace=True)
+        return self.health()
+
+    def recognize(self, wav_file_path, content_type='audio/wav; codecs=audio/pcm; samplerate=16000', audio_bytes=None):
+        """
+        POST audio to the STT endpoint through the scheduler and return an STTResponse.
+        The WAV file is streamed from disk unless already-prepared audio_bytes are given.
+        """
+        return self.scheduler.run(lambda: self._send(wav_file_path, content_type, audio_bytes))
+
+    def _send(self, wav_file_path, content_type, audio_bytes=None):
+        content_length = len(audio_bytes) if audio_bytes is not None else os.path.getsize(wav_file_path)
+        headers = {
+            'Content-Type': content_type,
+            'Content-Length': str(content_length),
+            'Ocp-Apim-Subscription-Key': self.key,
+            'Ocp-Apim-Subscription-Region': self.region,
+            'Accept': 'application/json'
+        }
+
+        while True:
+            connection, reused = self._acquire()
+            try:
+                if audio_bytes is not None:
+                    connection.request('POST', self._path, body=audio_bytes, headers=headers)
+                else:
+                    with open(wav_file_path, 'rb') as body:
+                        connection.request('POST', self._path, body=body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+            except STALE_CONNECTION_ERRORS as e:
+                connection.close()
+                # A reused connection may have been dropped while idle; retry on a fresh one
+                if reused:
+                    continue
+                self._record_health(False, error=str(e))
+                raise
+            except Exception as e:
+                connection.close()
+                self._record_health(False, error=str(e))
+                raise
+
+            self._record_health(True, status_code=response.status)
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            break
+
+        data = None
+        if payload:
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                data = None
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        return STTResponse(response.status, data, payload.decode('utf-8', errors='replace'), response_headers)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+def get_stt_client(url, key, region):
+    """Return the process-wide client for an STT endpoint"""
+    with _shared_clients_lock:
+        client = _shared_clients.get(url)
+        if client is None:
+            client = STTClient(url, key, region)
+            _shared_clients[url] = client
+        return client
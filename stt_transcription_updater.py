@@ -2,16 +2,25 @@
 
 import json
 import os
-import subprocess
+import socket
 import sys
 from datetime import datetime
 import tempfile
 import shutil
 
+from assistant_db import AssistantConfigWriter
+from audio_preflight import AudioPreflightError, preflight_wav
+from language_overlay import get_language_mappings, iter_stored_nodes, stored_node_languages
+from stt_client import get_stt_client
+from transcription_cache import get_transcription_cache, hash_wav_file
+from transcript_index import TranscriptIndex, index_path_for
+
 # Azure STT Configuration
 AZURE_STT_KEY = "7yAOU8Ce9WpRZnuBSBCKtnptzwRsgBwC41dZIFmKRSn34nc4A85xJQQJ99BIACF24PCXJ3w3AAAYACOGvMSy"
 AZURE_STT_REGION = "uaenorth"
-STT_URL = f"https://{AZURE_STT_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language=en-US&format=detailed"
+STT_LANGUAGE = "en-US"
+STT_FORMAT = "detailed"
+STT_URL = f"https://{AZURE_STT_REGION}.stt.speech.microsoft.com/speech/recognition/conversation/cognitiveservices/v1?language={STT_LANGUAGE}&format={STT_FORMAT}"
 
 def log(level, message):
     """Log with timestamp"""
@@ -19,7 +28,7 @@ def log(level, message):
     print(f"[{timestamp}] {level}: {message}", file=sys.stderr)
 
 def transcribe_wav_file(wav_file_path):
-    """Transcribe a single WAV file using Azure STT API"""
+    """Transcribe a single WAV file using Azure STT API over the pooled STT client"""
     log("INFO", f"Transcribing WAV file: {wav_file_path}")
     
     try:
@@ -36,71 +45,89 @@ def transcribe_wav_file(wav_file_path):
         file_size = os.path.getsize(wav_file_path)
         log("DEBUG", f"File size: {file_size} bytes")
         
-        # Perform STT transcription
-        curl_cmd = [
-            'curl', '-s', '-w', '%{http_code}',
-            '-X', 'POST', STT_URL,
-            '-H', 'Content-Type: audio/wav; codecs=audio/pcm; samplerate=16000',
-            '-H', f'Ocp-Apim-Subscription-Key: {AZURE_STT_KEY}',
-            '-H', f'Ocp-Apim-Subscription-Region: {AZURE_STT_REGION}',
-            '-H', 'Accept: application/json',
-            '--data-binary', f'@{wav_file_path}'
-        ]
+        # Reuse an earlier transcription of identical audio
+        cache = get_transcription_cache()
+        cache_key = None
+        if cache is not None:
+            try:
+                cache_key = cache.key_for_file(wav_file_path, STT_LANGUAGE, STT_FORMAT)
+                cached_result = cache.get(cache_key)
+                if cached_result is not None:
+                    log("INFO", f"STT cache hit for {wav_file_path}")
+                    return cached_result
+            except Exception as e:
+                log("WARNING", f"STT cache lookup failed: {e}")
+                cache_key = None
         
+        # Perform STT transcription
         log("DEBUG", "Executing STT request...")
-        result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=60)
-        
-        log("DEBUG", f"Curl return code: {result.returncode}")
-        if result.stderr:
-            log("DEBUG", f"Curl stderr: {result.stderr}")
+        # Normalize the audio and skip files the STT service would reject
+        try:
+            audio = preflight_wav(wav_file_path)
+        except AudioPreflightError as e:
+            log("ERROR", f"Audio preflight rejected {wav_file_path}: {e}")
+            return {
+                'status': 'error',
+                'transcription': '',
+                'confidence': 0,
+                'error': f'Audio preflight failed: {e}'
+            }
+        if audio.changes:
+            log("DEBUG", f"Audio preflight: {', '.join(audio.changes)} ({len(audio.audio_bytes)} bytes to upload)")
         
-        response_text = result.stdout.strip()
-        status_code = response_text[-3:] if response_text[-3:].isdigit() else 'unknown'
-        json_response = response_text[:-3] if status_code != 'unknown' else response_text
+        response = get_stt_client(STT_URL, AZURE_STT_KEY, AZURE_STT_REGION).recognize(
+            wav_file_path, content_type=audio.content_type, audio_bytes=audio.audio_bytes
+        )
+        status_code = response.status_code
         
         log("DEBUG", f"Status code: {status_code}")
         
-        if status_code == '200' and json_response:
-            try:
-                stt_data = json.loads(json_response)
-                transcription = stt_data.get('DisplayText', '')
-                confidence = stt_data.get('Confidence', 0)
-                
-                if transcription:
-                    log("SUCCESS", f"STT completed - '{transcription}' (confidence: {confidence})")
-                    return {
-                        'status': 'success',
-                        'transcription': transcription,
-                        'confidence': confidence,
-                        'raw_response': stt_data
-                    }
-                else:
-                    log("WARNING", "Empty transcription received")
-                    return {
-                        'status': 'error',
-                        'transcription': '',
-                        'confidence': 0,
-                        'error': 'Empty transcription from Azure STT'
-                    }
-            except json.JSONDecodeError as e:
-                log("ERROR", f"JSON parse error: {e}")
+        if status_code == 200 and isinstance(response.data, dict):
+            stt_data = response.data
+            transcription = stt_data.get('DisplayText', '')
+            confidence = stt_data.get('Confidence', 0)
+            
+            if transcription:
+                log("SUCCESS", f"STT completed - '{transcription}' (confidence: {confidence})")
+                stt_result = {
+                    'status': 'success',
+                    'transcription': transcription,
+                    'confidence': confidence,
+                    'raw_response': stt_data
+                }
+                if cache_key is not None:
+                    try:
+                        cache.put(cache_key, stt_result)
+                    except Exception as e:
+                        log("WARNING", f"STT cache store failed: {e}")
+                return stt_result
+            else:
+                log("WARNING", "Empty transcription received")
                 return {
                     'status': 'error',
                     'transcription': '',
                     'confidence': 0,
-                    'error': f'JSON parse error: {e}'
+                    'error': 'Empty transcription from Azure STT'
                 }
+        elif status_code == 200:
+            log("ERROR", f"JSON parse error: {response.body[:200]}")
+            return {
+                'status': 'error',
+                'transcription': '',
+                'confidence': 0,
+                'error': f'JSON parse error: {response.body[:200]}'
+            }
         else:
             log("ERROR", f"STT request failed - Status: {status_code}")
-            log("DEBUG", f"Response: {response_text}")
+            log("DEBUG", f"Response: {response.body}")
             return {
                 'status': 'error',
                 'transcription': '',
                 'confidence': 0,
-                'error': f'HTTP {status_code}: {json_response}'
+                'error': f'HTTP {status_code}: {response.body}'
             }
             
-    except subprocess.TimeoutExpired:
+    except socket.timeout:
         log("ERROR", "STT request timeout")
         return {
             'status': 'error',
@@ -126,119 +153,225 @@ def clean_filename(filename):
             return filename[dash_index + 1:]
     return filename
 
-def collect_wav_files_from_json(json_file):
-    """Collect all WAV file paths from the JSON file"""
-    log("INFO", f"Reading JSON file: {json_file}")
+def unreachable_node_ids(data):
+    """Return the ids of the Navigation nodes whose prompts the processor skipped as unreachable"""
+    return {node['id'] for node in data.get('metadata', {}).get('unreachable_prompts', [])}
+
+def build_wav_slot_index(data):
+    """
+    Index every transcription slot by WAV path in one pass over the language mappings.
+    Returns (wav_files, slot_index): one wav_file entry per unique path, and
+    {path: [(stt_data, kind, position, languages), ...]} covering every stored node that uses
+    it, where languages is how many languages share that stored node (1 in the full format).
+    Paths only used by unreachable nodes are left out, like the processor does; their slots
+    are still filled when a reachable node shares the path.
+    """
+    skipped_nodes = unreachable_node_ids(data)
+    ivr_stt_array = data.get('ivr_stt_array', {})
+    wav_files = {}
+    slot_index = {}
     
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    # Works on both the full and the overlay format; shared overlay nodes have no language
+    for lang, node_id, node_data in iter_stored_nodes(ivr_stt_array):
+        languages = stored_node_languages(ivr_stt_array, lang, node_id)
+        stt_data = node_data.get('stt', {})
+        original_filenames = stt_data.get('original_filenames', {})
         
-        wav_files = []
-        ivr_stt_array = data.get('ivr_stt_array', {})
-        language_mappings = ivr_stt_array.get('language_mappings', {})
-        
-        # Collect WAV files from all language mappings
-        for lang, lang_data in language_mappings.items():
-            nodes = lang_data.get('nodes', {})
-            for node_id, node_data in nodes.items():
-                stt_data = node_data.get('stt', {})
-                original_filenames = stt_data.get('original_filenames', {})
-                
-                # Collect voice files
-                for filename in original_filenames.get('voice', []):
-                    # Filename is already clean and complete path
-                    wav_files.append({
-                        'path': filename,
-                        'filename': filename.split('/')[-1] if '/' in filename else filename,
-                        'original_filename': filename,
-                        'type': 'voice',
-                        'node_id': node_id,
-                        'language': lang
-                    })
-                
-                # Collect DTMF files
-                for filename in original_filenames.get('dtmf', []):
-                    # Filename is already clean and complete path
-                    wav_files.append({
+        for kind in ('voice', 'dtmf'):
+            for position, filename in enumerate(original_filenames.get(kind, [])):
+                # Filename is already clean and complete path
+                slots = slot_index.get(filename)
+                if slots is None:
+                    slots = slot_index[filename] = []
+                if filename not in wav_files and node_id not in skipped_nodes:
+                    wav_files[filename] = {
                         'path': filename,
                         'filename': filename.split('/')[-1] if '/' in filename else filename,
                         'original_filename': filename,
-                        'type': 'dtmf',
+                        'type': kind,
                         'node_id': node_id,
                         'language': lang
-                    })
+                    }
+                slots.append((stt_data, kind, position, languages))
+    
+    slot_index = {filename: slot_index[filename] for filename in wav_files}
+    return list(wav_files.values()), slot_index
+
+def collect_wav_files_from_json(json_file):
+    """Collect the unique WAV file paths from the JSON file, with the slot index that uses them"""
+    log("INFO", f"Reading JSON file: {json_file}")
+    
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
         
-        # Remove duplicates based on path
-        unique_wav_files = []
-        seen_paths = set()
-        for wav_file in wav_files:
-            if wav_file['path'] not in seen_paths:
-                unique_wav_files.append(wav_file)
-                seen_paths.add(wav_file['path'])
+        unique_wav_files, slot_index = build_wav_slot_index(data)
         
         log("SUCCESS", f"Found {len(unique_wav_files)} unique WAV files")
         log("DEBUG", f"Sample cleaned filenames:")
         for wav_file in unique_wav_files[:3]:  # Show first 3 as examples
             log("DEBUG", f"  Original: {wav_file['original_filename']} -> Clean: {wav_file['filename']}")
         
-        return unique_wav_files, data
+        return unique_wav_files, data, slot_index
         
     except Exception as e:
         log("ERROR", f"Failed to read JSON file: {e}")
-        return [], None
+        return [], None, {}
+
+def manifest_path_for(json_file):
+    """Return the path of the STT manifest kept next to a JSON file"""
+    return f"{json_file}.stt_manifest.json"
 
-def update_json_with_transcriptions(data, transcription_results):
+def load_stt_manifest(manifest_file):
+    """Load the per-prompt STT manifest, or an empty one if it does not exist yet"""
+    if not os.path.exists(manifest_file):
+        return {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except Exception as e:
+        log("WARNING", f"Ignoring unreadable STT manifest {manifest_file}: {e}")
+        return {}
+
+def save_stt_manifest(manifest_file, manifest):
+    """Write the STT manifest atomically"""
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'updated_at': datetime.now().isoformat(), 'files': manifest}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, manifest_file)
+
+def select_changed_wav_files(wav_files, manifest):
+    """Split WAV files into (files to transcribe, reusable results) using the manifest"""
+    to_transcribe = []
+    reused_results = {}
+    
+    for wav_file in wav_files:
+        path = wav_file['path']
+        entry = manifest.get(path)
+        if entry is None or entry.get('result', {}).get('status') != 'success':
+            to_transcribe.append(wav_file)
+            continue
+        
+        try:
+            stat = os.stat(path)
+        except OSError:
+            to_transcribe.append(wav_file)
+            continue
+        
+        if entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            reused_results[path] = entry['result']
+            continue
+        
+        # Size or mtime moved; the content may still be identical (e.g. a re-deployed prompt)
+        if entry.get('size') == stat.st_size and entry.get('sha256') == hash_wav_file(path):
+            entry['mtime'] = stat.st_mtime
+            reused_results[path] = entry['result']
+            continue
+        
+        to_transcribe.append(wav_file)
+    
+    return to_transcribe, reused_results
+
+def record_manifest_entry(manifest, path, result):
+    """Store a transcription result with the file fingerprint it was made from"""
+    try:
+        stat = os.stat(path)
+        fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': hash_wav_file(path)}
+    except OSError:
+        fingerprint = {'size': None, 'mtime': None, 'sha256': None}
+    
+    manifest[path] = dict(fingerprint, result={
+        'status': result.get('status', 'error'),
+        'transcription': result.get('transcription', ''),
+        'confidence': result.get('confidence', 0)
+    })
+
+def journal_path_for(json_file):
+    """Return the path of the checkpoint journal kept next to a JSON file"""
+    return f"{json_file}.stt_journal.jsonl"
+
+def load_transcription_journal(journal_file):
+    """Read {path: result} for every file recorded in a checkpoint journal"""
+    journaled_results = {}
+    if not os.path.exists(journal_file):
+        return journaled_results
+    
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a partially written last line
+                log("WARNING", f"Skipping unreadable journal line {line_number} in {journal_file}")
+                continue
+            journaled_results[record['path']] = record['result']
+    
+    return journaled_results
+
+class TranscriptionJournal:
+    """Append-only JSONL checkpoint, one record per finished transcription"""
+    
+    def __init__(self, journal_file, resume=False):
+        self.journal_file = journal_file
+        if resume and os.path.exists(journal_file):
+            self._drop_partial_last_line(journal_file)
+        self._file = open(journal_file, 'a' if resume else 'w', encoding='utf-8')
+    
+    @staticmethod
+    def _drop_partial_last_line(journal_file):
+        """Truncate a record left half-written by a crash so new records start on their own line"""
+        with open(journal_file, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+    
+    def record(self, path, result):
+        entry = {
+            'path': path,
+            'result': {
+                'status': result.get('status', 'error'),
+                'transcription': result.get('transcription', ''),
+                'confidence': result.get('confidence', 0),
+                'error': result.get('error', '')
+            },
+            'finished_at': datetime.now().isoformat()
+        }
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def close(self):
+        self._file.close()
+
+def update_json_with_transcriptions(data, transcription_results, slot_index=None):
     """Update the JSON data with transcription results"""
     log("INFO", "Updating JSON with transcription results")
     
-    ivr_stt_array = data.get('ivr_stt_array', {})
-    language_mappings = ivr_stt_array.get('language_mappings', {})
+    if slot_index is None:
+        _, slot_index = build_wav_slot_index(data)
     
     successful_transcriptions = 0
     failed_transcriptions = 0
     
-    # Update transcriptions in all language mappings
-    for lang, lang_data in language_mappings.items():
-        nodes = lang_data.get('nodes', {})
-        for node_id, node_data in nodes.items():
-            stt_data = node_data.get('stt', {})
-            
-            # Update voice transcriptions
-            voice_transcriptions = []
-            for filename in stt_data.get('original_filenames', {}).get('voice', []):
-                # Filename is already clean and complete path
-                if filename in transcription_results:
-                    result = transcription_results[filename]
-                    if result['status'] == 'success':
-                        voice_transcriptions.append(result['transcription'])
-                        successful_transcriptions += 1
-                    else:
-                        voice_transcriptions.append('')
-                        failed_transcriptions += 1
-                else:
-                    voice_transcriptions.append('')
-                    failed_transcriptions += 1
-            
-            # Update DTMF transcriptions
-            dtmf_transcriptions = []
-            for filename in stt_data.get('original_filenames', {}).get('dtmf', []):
-                # Filename is already clean and complete path
-                if filename in transcription_results:
-                    result = transcription_results[filename]
-                    if result['status'] == 'success':
-                        dtmf_transcriptions.append(result['transcription'])
-                        successful_transcriptions += 1
-                    else:
-                        dtmf_transcriptions.append('')
-                        failed_transcriptions += 1
-                else:
-                    dtmf_transcriptions.append('')
-                    failed_transcriptions += 1
-            
-            # Update the stt data
-            stt_data['voice'] = voice_transcriptions
-            stt_data['dtmf'] = dtmf_transcriptions
+    # Size each transcription list to its filenames; every position is overwritten below
+    for slots in slot_index.values():
+        for stt_data, kind, _, _ in slots:
+            expected_length = len(stt_data['original_filenames'][kind])
+            if len(stt_data.get(kind) or []) != expected_length:
+                stt_data[kind] = [''] * expected_length
+    
+    # Resolve each unique path once and fill all of its slots; counts are per language in either format
+    for filename, slots in slot_index.items():
+        result = transcription_results.get(filename)
+        uses = sum(languages for _, _, _, languages in slots)
+        if result is not None and result['status'] == 'success':
+            transcription = result['transcription']
+            successful_transcriptions += uses
+        else:
+            transcription = ''
+            failed_transcriptions += uses
+        for stt_data, kind, position, _ in slots:
+            stt_data[kind][position] = transcription
     
     # Update metadata
     metadata = data.get('metadata', {})
@@ -273,7 +406,7 @@ def generate_sql_update(json_file, assistant_id):
         sql_update = f"""-- Update Assistant Configuration for Assistant ID {assistant_id}
 -- Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 -- Source JSON file: {json_file}
--- IVR STT Array language mappings: {len(ivr_stt_array.get('language_mappings', {}))}
+-- IVR STT Array language mappings: {len(get_language_mappings(ivr_stt_array))}
 -- Path Finder JSON nodes: {len(path_finder_json.get('nodes', []))}
 -- Successful STT transcriptions: {metadata.get('successful_stt_transcriptions', 0)}
 
@@ -306,50 +439,44 @@ WHERE assistant_id = {assistant_id};"""
         log("ERROR", f"Failed to generate SQL: {e}")
         return None
 
-def execute_database_update(sql_file, db_config):
-    """Execute the database update"""
-    log("INFO", f"Executing database update: {sql_file}")
+def execute_database_update(data, assistant_id, db_config):
+    """Write the updated arrays straight to assistant_configuration with bound parameters"""
+    log("INFO", f"Updating assistant_configuration for assistant ID {assistant_id}")
     
     try:
-        # Build mysql command
-        mysql_cmd = [
-            'mysql',
-            f'-h{db_config["host"]}',
-            f'-P{db_config["port"]}',
-            f'-u{db_config["username"]}'
-        ]
-        
-        if db_config["password"]:
-            mysql_cmd.append(f'-p{db_config["password"]}')
+        writer = AssistantConfigWriter.for_mysql(db_config)
+        try:
+            rows_updated = writer.update_assistant(
+                assistant_id,
+                data.get('ivr_stt_array', {}),
+                data.get('path_finder_json', {})
+            )
+        finally:
+            writer.close()
         
-        mysql_cmd.extend([db_config["database"], f'< {sql_file}'])
-        
-        # Execute the command
-        cmd_str = ' '.join(mysql_cmd)
-        log("DEBUG", f"Executing: {cmd_str}")
+        if rows_updated == 0:
+            log("ERROR", f"No assistant_configuration row for assistant ID {assistant_id}")
+            return False
         
-        result = subprocess.run(cmd_str, shell=True, capture_output=True, text=True)
+        log("SUCCESS", "Database update executed successfully!")
+        return True
         
-        if result.returncode == 0:
-            log("SUCCESS", "Database update executed successfully!")
-            return True
-        else:
-            log("ERROR", f"Database update failed: {result.stderr}")
-            return False
-            
     except Exception as e:
         log("ERROR", f"Failed to execute database update: {e}")
         return False
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 stt_transcription_updater.py <json_file> [assistant_id] [--execute-db]")
-        print("Example: python3 stt_transcription_updater.py ivr_stt_output.json 1 --execute-db")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: python3 stt_transcription_updater.py <json_file> [assistant_id] [--execute-db] [--incremental] [--resume]")
+        print("Example: python3 stt_transcription_updater.py ivr_stt_output.json 1 --execute-db --incremental")
         sys.exit(1)
     
-    json_file = sys.argv[1]
-    assistant_id = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    json_file = args[0]
+    assistant_id = int(args[1]) if len(args) > 1 else 1
     execute_db = '--execute-db' in sys.argv
+    incremental = '--incremental' in sys.argv
+    resume = '--resume' in sys.argv
     
     # Database configuration
     db_config = {
@@ -364,24 +491,56 @@ def main():
     log("INFO", f"JSON file: {json_file}")
     log("INFO", f"Assistant ID: {assistant_id}")
     log("INFO", f"Execute DB: {execute_db}")
+    log("INFO", f"Incremental: {incremental}")
+    log("INFO", f"Resume: {resume}")
     
     # Step 1: Collect WAV files from JSON
-    wav_files, data = collect_wav_files_from_json(json_file)
+    wav_files, data, slot_index = collect_wav_files_from_json(json_file)
     if not wav_files:
         log("ERROR", "No WAV files found in JSON")
         sys.exit(1)
     
     # Step 2: Perform STT transcription
-    log("INFO", f"Starting STT transcription for {len(wav_files)} files")
+    manifest_file = manifest_path_for(json_file)
+    manifest = load_stt_manifest(manifest_file)
     transcription_results = {}
+    pending_files = wav_files
+    
+    if incremental:
+        pending_files, transcription_results = select_changed_wav_files(wav_files, manifest)
+        log("INFO", f"Incremental mode: {len(transcription_results)} unchanged, {len(pending_files)} new, changed or previously failed")
     
-    for i, wav_file in enumerate(wav_files, 1):
-        log("INFO", f"Processing file {i}/{len(wav_files)}: {wav_file['filename']}")
-        result = transcribe_wav_file(wav_file['path'])
-        transcription_results[wav_file['path']] = result
+    journal_file = journal_path_for(json_file)
+    if resume:
+        # Files that finished successfully before the interruption are not sent again
+        journaled_results = {
+            path: result for path, result in load_transcription_journal(journal_file).items()
+            if result['status'] == 'success'
+        }
+        transcription_results.update(journaled_results)
+        for path, result in journaled_results.items():
+            record_manifest_entry(manifest, path, result)
+        pending_files = [wav_file for wav_file in pending_files if wav_file['path'] not in journaled_results]
+        log("INFO", f"Resuming: {len(journaled_results)} files already journaled in {journal_file}")
+    
+    log("INFO", f"Starting STT transcription for {len(pending_files)} files")
+    
+    journal = TranscriptionJournal(journal_file, resume=resume)
+    try:
+        for i, wav_file in enumerate(pending_files, 1):
+            log("INFO", f"Processing file {i}/{len(pending_files)}: {wav_file['filename']}")
+            result = transcribe_wav_file(wav_file['path'])
+            transcription_results[wav_file['path']] = result
+            journal.record(wav_file['path'], result)
+            record_manifest_entry(manifest, wav_file['path'], result)
+    finally:
+        journal.close()
+    
+    save_stt_manifest(manifest_file, manifest)
+    log("INFO", f"Saved STT manifest: {manifest_file}")
     
     # Step 3: Update JSON with transcriptions
-    updated_data = update_json_with_transcriptions(data, transcription_results)
+    updated_data = update_json_with_transcriptions(data, transcription_results, slot_index)
     
     # Step 4: Save updated JSON
     backup_file = f"{json_file}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -393,20 +552,26 @@ def main():
     
     log("SUCCESS", f"Updated JSON file: {json_file}")
     
-    # Step 5: Generate SQL update
-    sql_file = generate_sql_update(json_file, assistant_id)
-    if not sql_file:
-        log("ERROR", "Failed to generate SQL file")
-        sys.exit(1)
+    # Index the transcriptions so caller utterances can be matched to nodes without a scan
+    index_file = index_path_for(json_file)
+    TranscriptIndex.build(updated_data.get('ivr_stt_array', {})).save(index_file)
+    log("SUCCESS", f"Transcript index written: {index_file}")
     
-    # Step 6: Execute database update if requested
+    # The JSON now holds every result, so the checkpoint is no longer needed
+    os.remove(journal_file)
+    
+    # Step 5: Write to the database, or leave a SQL file for manual execution
     if execute_db:
-        if execute_database_update(sql_file, db_config):
+        if execute_database_update(updated_data, assistant_id, db_config):
             log("SUCCESS", "Database update completed successfully!")
         else:
             log("ERROR", "Database update failed!")
             sys.exit(1)
     else:
+        sql_file = generate_sql_update(json_file, assistant_id)
+        if not sql_file:
+            log("ERROR", "Failed to generate SQL file")
+            sys.exit(1)
         log("INFO", f"SQL file ready for manual execution: {sql_file}")
     
     # Final summary
@@ -415,6 +580,7 @@ def main():
     log("INFO", f"Successful transcriptions: {metadata.get('successful_stt_transcriptions', 0)}")
     log("INFO", f"Failed transcriptions: {metadata.get('failed_stt_transcriptions', 0)}")
     log("INFO", f"Total files processed: {len(wav_files)}")
+    log("INFO", f"STT request stats: {get_stt_client(STT_URL, AZURE_STT_KEY, AZURE_STT_REGION).scheduler.stats()}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Checks AssistantConfigWriter against a local SQLite stand-in for assistant_configuration.
+Runs with pytest or directly: python3 test_assistant_db.py
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+
+from assistant_db import AssistantConfigWriter
+
+def _database():
+    handle, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE assistant_configuration (
+            assistant_id INTEGER PRIMARY KEY,
+            name TEXT,
+            ivr_stt_array TEXT,
+            path_finder_json TEXT,
+            updatedOn TEXT
+        )
+    """)
+    connection.executemany(
+        'INSERT INTO assistant_configuration VALUES (?, ?, ?, ?, ?)',
+        [(1, 'first', '{}', '{}', None), (2, 'second', '{}', '{}', None)]
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+def _rows(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(
+            'SELECT assistant_id, ivr_stt_array, path_finder_json, updatedOn FROM assistant_configuration ORDER BY assistant_id'
+        ).fetchall()
+    finally:
+        connection.close()
+
+def test_batch_update_writes_compact_json():
+    path = _database()
+    try:
+        writer = AssistantConfigWriter.for_sqlite(path)
+        rows_updated = writer.update_assistants([
+            (1, {'prompt': "it's here"}, {'nodes': [{'id': '3'}]}),
+            (2, {'prompt': 'second'}, {'nodes': []}),
+            (3, {}, {})
+        ])
+        writer.close()
+
+        assert rows_updated == {1: 1, 2: 1, 3: 0}
+        rows = _rows(path)
+        # Bound parameters keep quotes intact and the JSON is stored without indentation
+        assert rows[0][1] == "{\"prompt\":\"it's here\"}"
+        assert json.loads(rows[0][2]) == {'nodes': [{'id': '3'}]}
+        assert rows[1][1] == '{"prompt":"second"}'
+        assert rows[0][3] is not None and rows[0][3] == rows[1][3]
+    finally:
+        os.remove(path)
+
+def test_failed_batch_rolls_back():
+    path = _database()
+    try:
+        before = _rows(path)
+        writer = AssistantConfigWriter.for_sqlite(path)
+        try:
+            writer.update_assistants([
+                (1, {'prompt': 'changed'}, {'nodes': []}),
+                (2, object(), {'nodes': []})
+            ])
+        except TypeError:
+            pass
+        else:
+            raise AssertionError('an unserializable value should fail the batch')
+
+        # The connection stays usable for the next batch
+        assert writer.update_assistant(2, {'prompt': 'retry'}, {'nodes': []}) == 1
+        writer.close()
+
+        rows = _rows(path)
+        assert rows[0] == before[0]
+        assert rows[1][1] == '{"prompt":"retry"}'
+    finally:
+        os.remove(path)
+
+def test_rerun_with_same_values_still_finds_the_row():
+    path = _database()
+    try:
+        writer = AssistantConfigWriter.for_sqlite(path)
+        assert writer.update_assistant(1, {'a': 1}, {'b': 2}) == 1
+        assert writer.update_assistant(1, {'a': 1}, {'b': 2}) == 1
+        writer.close()
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith('test_') and callable(check):
+            check()
+            print(f"{name}: OK")
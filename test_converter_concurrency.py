@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Stress test for XMLToFlatArrayConverter: many parses of different flows run in parallel on
+one shared converter (with a small cache, so entries are evicted and re-parsed), and every
+result must match a serial parse of the same flow.
+Needs the Sakura service's logger and config packages on PYTHONPATH, like the converter itself.
+Usage: python3 test_converter_concurrency.py [threads] [parses]
+"""
+
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+def build_flows(base_xml, count):
+    """Variants of the base flow with different labels, so every flow has its own result"""
+    flows = [base_xml]
+    for index in range(1, count):
+        flows.append(base_xml.replace('value="mainmenu"', f'value="mainmenu {index}"').replace(
+            'value="databundles"', f'value="databundles {index}"'))
+    return flows
+
+def main():
+    from xml_to_flat_array_service import XMLToFlatArrayConverter
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    parses = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+
+    with open('xml.xml', 'r', encoding='utf-8') as f:
+        flows = build_flows(f.read(), 21)
+
+    expected = [XMLToFlatArrayConverter(cache_size=0).parse_xml_string_to_flat_array(flow) for flow in flows]
+    if len({str(result) for result in expected}) != len(flows):
+        print("FAILED: flow variants do not produce distinct results")
+        sys.exit(1)
+
+    shared = XMLToFlatArrayConverter(cache_size=8)
+    order = [random.randrange(len(flows)) for _ in range(parses)]
+
+    def parse(flow_index):
+        result = shared.parse_xml_string_to_flat_array(flows[flow_index])
+        matches = result == expected[flow_index]
+        # Results belong to the caller; changing one must not leak into later requests
+        result['nodes'][0]['children'].append('mutated')
+        result['metadata']['total_nodes'] = -1
+        return matches
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        outcomes = list(executor.map(parse, order))
+
+    mismatches = outcomes.count(False)
+    print(f"{parses} parses of {len(flows)} flows on {threads} threads: {mismatches} mismatches, cache {shared.cache_stats()}")
+    if mismatches:
+        print("FAILED: parallel results differ from serial runs")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Checks STTClient/STTScheduler against a local stub STT server that simulates throttling.
+Runs with pytest or directly: python3 test_stt_scheduler.py
+"""
+
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from stt_client import STTClient, STTScheduler
+
+class StubSTTServer:
+    """
+    Threaded stand-in for the Azure STT endpoint. The next `throttle` requests get 429 with
+    Retry-After: retry_after, the next `fail` requests get 503, and everything else succeeds.
+    """
+
+    def __init__(self, throttle=0, fail=0, retry_after='0'):
+        self.throttle = throttle
+        self.fail = fail
+        self.retry_after = retry_after
+        self.requests = 0
+        self.request_times = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.request_times.append(time.monotonic())
+                    if stub.throttle > 0:
+                        stub.throttle -= 1
+                        status, body, headers = 429, {'error': 'throttled'}, {'Retry-After': stub.retry_after}
+                    elif stub.fail > 0:
+                        stub.fail -= 1
+                        status, body, headers = 503, {'error': 'unavailable'}, {}
+                    else:
+                        status, body, headers = 200, {'RecognitionStatus': 'Success', 'DisplayText': 'Hello.', 'Confidence': 0.9}, {}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}/speech?language=en-US&format=detailed'
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def _wav_file():
+    """A tiny 16 kHz mono WAV to upload"""
+    frames = b'\x00\x01' * 1600
+    header = b'RIFF' + struct.pack('<I', 36 + len(frames)) + b'WAVEfmt ' + struct.pack('<IHHIIHH', 16, 1, 1, 16000, 32000, 2, 16)
+    handle, path = tempfile.mkstemp(suffix='.wav')
+    with os.fdopen(handle, 'wb') as f:
+        f.write(header + b'data' + struct.pack('<I', len(frames)) + frames)
+    return path
+
+def _client(server, **scheduler_options):
+    options = {'rate_limit': 100, 'max_concurrency': 4, 'max_retries': 4, 'backoff_base': 0.01, 'backoff_max': 0.05}
+    options.update(scheduler_options)
+    return STTClient(server.url, 'key', 'region', scheduler=STTScheduler(**options))
+
+def test_throttled_requests_are_retried():
+    server = StubSTTServer(throttle=5)
+    wav_file = _wav_file()
+    try:
+        client = _client(server)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            responses = list(executor.map(lambda _: client.recognize(wav_file), range(20)))
+        stats = client.scheduler.stats()
+        assert all(response.status_code == 200 for response in responses)
+        assert server.requests == 25
+        assert stats['succeeded'] == 20 and stats['failed'] == 0
+        assert stats['throttled'] == 5 and stats['retries'] == 5
+    finally:
+        server.close()
+        os.remove(wav_file)
+
+def test_retry_after_pauses_requests():
+    server = StubSTTServer(throttle=1, retry_after='1')
+    wav_file = _wav_file()
+    try:
+        client = _client(server)
+        response = client.recognize(wav_file)
+        assert response.status_code == 200
+        assert server.request_times[1] - server.request_times[0] >= 0.95
+        stats = client.scheduler.stats()
+        assert stats['wait_seconds'] >= 0.95
+        # The 429 halved the bucket rate and the success only crept it back up by a twentieth
+        assert stats['current_rate'] == 55
+    finally:
+        server.close()
+        os.remove(wav_file)
+
+def test_server_errors_retry_then_give_up():
+    server = StubSTTServer(fail=10)
+    wav_file = _wav_file()
+    try:
+        client = _client(server, max_retries=2)
+        response = client.recognize(wav_file)
+        stats = client.scheduler.stats()
+        assert response.status_code == 503
+        assert server.requests == 3
+        assert stats['server_errors'] == 3 and stats['retries'] == 2 and stats['failed'] == 1
+    finally:
+        server.close()
+        os.remove(wav_file)
+
+def test_rate_limit_spaces_requests():
+    server = StubSTTServer()
+    wav_file = _wav_file()
+    try:
+        client = _client(server, rate_limit=10)
+        started = time.monotonic()
+        for _ in range(16):
+            client.recognize(wav_file)
+        # The first 10 requests use the initial bucket; the other 6 wait for refills at 10/s
+        assert time.monotonic() - started >= 0.5
+        assert client.scheduler.stats()['succeeded'] == 16
+    finally:
+        server.close()
+        os.remove(wav_file)
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith('test_') and callable(check):
+            check()
+            print(f"{name}: OK")
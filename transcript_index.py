@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import heapq
+import json
+import math
+import os
+import re
+
+from language_overlay import get_language_mappings
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+INDEX_VERSION = 1
+
+_TOKEN = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+
+def tokenize(text):
+    """Lower-case word tokens of a transcript or caller utterance"""
+    return _TOKEN.findall(text.lower())
+
+def index_path_for(json_file):
+    return f"{json_file}.stt_index.json"
+
+class TranscriptIndex:
+    """
+    Inverted index over the voice and DTMF prompt transcriptions of each language mapping.
+    Postings hold precomputed BM25 weights, so a query only sums the weights of its tokens.
+    """
+
+    def __init__(self, languages=None):
+        # {language: {token: [[node_id, weight], ...]}}
+        self.languages = languages or {}
+
+    @classmethod
+    def build(cls, ivr_stt_array, k1=BM25_K1, b=BM25_B):
+        """Index every node of every language mapping in an ivr_stt_array (full or overlay format)"""
+        languages = {}
+        for lang, lang_data in get_language_mappings(ivr_stt_array).items():
+            term_counts = {}
+            for node_id, node_data in lang_data.get('nodes', {}).items():
+                stt_data = node_data.get('stt', {})
+                counts = {}
+                for transcription in (stt_data.get('voice') or []) + (stt_data.get('dtmf') or []):
+                    for token in tokenize(transcription or ''):
+                        counts[token] = counts.get(token, 0) + 1
+                if counts:
+                    term_counts[node_id] = counts
+
+            document_count = len(term_counts)
+            if not document_count:
+                languages[lang] = {}
+                continue
+            lengths = {node_id: sum(counts.values()) for node_id, counts in term_counts.items()}
+            average_length = sum(lengths.values()) / document_count
+
+            document_frequency = {}
+            for counts in term_counts.values():
+                for token in counts:
+                    document_frequency[token] = document_frequency.get(token, 0) + 1
+
+            postings = {}
+            for node_id, counts in term_counts.items():
+                length_norm = k1 * (1 - b + b * lengths[node_id] / average_length)
+                for token, tf in counts.items():
+                    df = document_frequency[token]
+                    idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+                    weight = idf * tf * (k1 + 1) / (tf + length_norm)
+                    postings.setdefault(token, []).append([node_id, round(weight, 6)])
+            languages[lang] = postings
+        return cls(languages)
+
+    def query(self, text, language='default', top_k=5):
+        """Return up to top_k (node_id, score) pairs for an utterance, best match first"""
+        postings = self.languages.get(language)
+        if not postings:
+            return []
+        scores = {}
+        for token in tokenize(text):
+            for node_id, weight in postings.get(token, ()):
+                scores[node_id] = scores.get(node_id, 0.0) + weight
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def save(self, index_file):
+        """Write the index atomically as compact JSON"""
+        temp_file = f"{index_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'languages': self.languages}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_file, index_file)
+
+    @classmethod
+    def load(cls, index_file):
+        with open(index_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported transcript index version: {data.get('version')}")
+        return cls(data['languages'])
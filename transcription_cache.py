@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Cache location and eviction limits (override with environment variables)
+STT_CACHE_PATH = os.environ.get(
+    'STT_CACHE_PATH',
+    os.path.join(os.path.expanduser('~'), '.cache', 'ivr_stt', 'transcriptions.sqlite3')
+)
+STT_CACHE_MAX_BYTES = int(os.environ.get('STT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+STT_CACHE_MAX_AGE_DAYS = float(os.environ.get('STT_CACHE_MAX_AGE_DAYS', '30'))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_wav_file(wav_file_path):
+    """Return the SHA-256 hex digest of a WAV file's content"""
+    digest = hashlib.sha256()
+    with open(wav_file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class TranscriptionCache:
+    """Persistent STT result cache keyed by audio content hash, language and format"""
+
+    def __init__(self, path=STT_CACHE_PATH, max_bytes=STT_CACHE_MAX_BYTES, max_age_days=STT_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS transcriptions (
+                cache_key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(content_hash, language, stt_format):
+        """Build the cache key for an audio digest and STT settings"""
+        return f"{content_hash}:{language}:{stt_format}"
+
+    def key_for_file(self, wav_file_path, language, stt_format):
+        """Hash a WAV file and return its cache key"""
+        return self.make_key(hash_wav_file(wav_file_path), language, stt_format)
+
+    def get(self, cache_key):
+        """Return the cached STT result for a key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result, created_at FROM transcriptions WHERE cache_key = ?',
+                (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            result = json.loads(row[0])
+            # Entries written before empty transcriptions were excluded are dropped too
+            if now - row[1] > self.max_age_seconds or not self.is_cacheable(result):
+                self._conn.execute('DELETE FROM transcriptions WHERE cache_key = ?', (cache_key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                'UPDATE transcriptions SET accessed_at = ? WHERE cache_key = ?',
+                (now, cache_key)
+            )
+            self._conn.commit()
+        return result
+
+    @staticmethod
+    def is_cacheable(result):
+        """Only successful, non-empty transcriptions are reused; an empty one is retried next run"""
+        return result.get('status') == 'success' and bool(result.get('transcription'))
+
+    def put(self, cache_key, result):
+        """Store a successful STT result; error and empty results are never cached"""
+        if not self.is_cacheable(result):
+            return
+        payload = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO transcriptions (cache_key, result, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (cache_key, payload, len(payload.encode('utf-8')), now, now)
+            )
+            self._conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM transcriptions WHERE created_at < ?',
+                (time.time() - self.max_age_seconds,)
+            )
+            total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM transcriptions').fetchone()[0]
+            if total_bytes > self.max_bytes:
+                rows = self._conn.execute(
+                    'SELECT cache_key, size FROM transcriptions ORDER BY accessed_at'
+                ).fetchall()
+                stale_keys = []
+                for cache_key, size in rows:
+                    if total_bytes <= self.max_bytes:
+                        break
+                    stale_keys.append((cache_key,))
+                    total_bytes -= size
+                self._conn.executemany('DELETE FROM transcriptions WHERE cache_key = ?', stale_keys)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_shared_cache = None
+_shared_cache_failed = False
+_shared_cache_lock = threading.Lock()
+
+def get_transcription_cache():
+    """
+    Return the process-wide cache, or None when STT_CACHE_DISABLED is set or the cache
+    could not be opened (that is warned about once and transcription goes on uncached)
+    """
+    global _shared_cache, _shared_cache_failed
+    if os.environ.get('STT_CACHE_DISABLED'):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None and not _shared_cache_failed:
+            try:
+                _shared_cache = TranscriptionCache()
+            except Exception as e:
+                _shared_cache_failed = True
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] WARNING: STT cache disabled, could not open {STT_CACHE_PATH}: {e}", file=sys.stderr)
+        return _shared_cache
@@ -1,188 +1,384 @@
+import hashlib
 import json
 import xml.etree.ElementTree as ET
-from typing import Dict, Any, List
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from logger.__init__ import get_logger
 import html
 import re
-from config.ivr_path_config import get_land_before, get_non_skippable_types, get_is_skippable
+import sys
+import threading
+from config.ivr_path_config import get_land_before, get_is_skippable
+from route_table import build_route_table, build_transitions
 
 logger = get_logger(__name__)
 
-class XMLToFlatArrayConverter:
-    def __init__(self):
-        self.nodes = {}
-        self.connections = {}
-        self.node_types = {}
-        
-def parse_xml_string_to_flat_array(self, xml_string: str) -> Dict[str, Any]:
+# Attributes whose values embed markup the flat array never reads; they are blanked
+CLEARED_ATTRIBUTES = {'xmlParamsData'}
+
+_ATTRIBUTE_NAME = re.compile(r'\s*([A-Za-z_][\w:.-]*)\s*=\s*(["\'])')
+_TAG_NAME = re.compile(r'[A-Za-z_][\w:.-]*')
+_VALUE_SPECIAL = {'"': re.compile(r'[<>&"]'), "'": re.compile(r"[<>&']")}
+# XML predefines only these five named entities; anything else (e.g. &nbsp;) is escaped
+_VALID_ENTITY = re.compile(r'&(?:#[0-9]+|#x[0-9a-fA-F]+|amp|lt|gt|quot|apos);')
+# A complete start/end tag embedded in a value; a bare '<' (e.g. "balance < 100") is not markup
+_EMBEDDED_TAG = re.compile(r'</?[A-Za-z_][\w:.-]*(?:\s+[A-Za-z_][\w:.-]*\s*=\s*(?:"[^"<>]*"|\'[^\'<>]*\'))*\s*/?>')
+_EMBEDDED_TAG_SPECIAL = re.compile(r'[<>"\']')
+# A quote is the real end of a value only if a new attribute or the end of the tag follows
+_VALUE_END = re.compile(r'\s*/?>|\s+[A-Za-z_][\w:.-]*\s*=\s*["\']')
+_ESCAPES = {'<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&apos;'}
+_REPAIR_NAMES = {'<': 'escaped_lt', '>': 'escaped_gt', '&': 'escaped_amp', '"': 'escaped_quote', "'": 'escaped_quote'}
+
+
+def sanitize_xml_attributes(xml_string: str) -> Tuple[str, Dict[str, int]]:
     """
-    Parse XML string and convert to flat array structure
+    Repair attribute values that would break the XML parser, in one linear scan
     Args:
         xml_string (str): XML content as string
     Returns:
-        dict: Flat array with metadata
+        tuple: (repaired XML string, {repair name: count})
     """
-    logger.info(f"Creating flat_array from XM")
-    
-    # Unescape HTML entities and unicode escapes
-    xml_string = html.unescape(xml_string)
-    xml_string = re.sub(r'\\u003c', '<', xml_string)
-    xml_string = re.sub(r'\\u003e', '>', xml_string)
-    xml_string = re.sub(r'\\u0022', '"', xml_string)
-    xml_string = xml_string.strip()
+    out = []
+    repairs = {}
+    pos = 0
+    length = len(xml_string)
+
+    while pos < length:
+        tag_start = xml_string.find('<', pos)
+        if tag_start == -1:
+            out.append(xml_string[pos:])
+            break
+        out.append(xml_string[pos:tag_start])
+
+        # Comments, processing instructions, CDATA and end tags pass through untouched
+        for opener, closer in (('<!--', '-->'), ('<![CDATA[', ']]>'), ('<?', '?>'), ('<!', '>'), ('</', '>')):
+            if xml_string.startswith(opener, tag_start):
+                end = xml_string.find(closer, tag_start + len(opener))
+                end = length if end == -1 else end + len(closer)
+                out.append(xml_string[tag_start:end])
+                pos = end
+                break
+        else:
+            name_match = _TAG_NAME.match(xml_string, tag_start + 1)
+            if name_match is None:
+                out.append('<')
+                pos = tag_start + 1
+                continue
+            out.append(xml_string[tag_start:name_match.end()])
+            pos = name_match.end()
+
+            # Attributes
+            while True:
+                attr_match = _ATTRIBUTE_NAME.match(xml_string, pos)
+                if attr_match is None:
+                    break
+                out.append(attr_match.group(0))
+                attr_name, quote = attr_match.group(1), attr_match.group(2)
+                pos = attr_match.end()
+                value, pos = _scan_attribute_value(xml_string, pos, quote, repairs)
+                if attr_name in CLEARED_ATTRIBUTES and value:
+                    value = ''
+                    repairs[f'cleared_{attr_name}'] = repairs.get(f'cleared_{attr_name}', 0) + 1
+                out.append(value)
+                out.append(quote)
+                pos += 1
+
+    return ''.join(out), repairs
+
+
+def _scan_attribute_value(xml_string: str, pos: int, quote: str, repairs: Dict[str, int]) -> Tuple[str, int]:
+    """Return (escaped value, index of its closing quote) for the value starting at pos"""
+    special = _VALUE_SPECIAL[quote]
+    parts = []
+    length = len(xml_string)
+
+    while True:
+        match = special.search(xml_string, pos)
+        if match is None:
+            parts.append(xml_string[pos:])
+            return ''.join(parts), length
+        index = match.start()
+        parts.append(xml_string[pos:index])
+        char = xml_string[index]
+        pos = index + 1
+        tag = _EMBEDDED_TAG.match(xml_string, index) if char == '<' else None
+
+        if char == '&':
+            entity = _VALID_ENTITY.match(xml_string, index)
+            if entity is not None:
+                parts.append(entity.group(0))
+                pos = entity.end()
+                continue
+            parts.append('&amp;')
+        elif char == quote and _VALUE_END.match(xml_string, pos):
+            return ''.join(parts), index
+        elif tag is not None:
+            # Quotes inside markup embedded in the value belong to that markup
+            parts.append(_EMBEDDED_TAG_SPECIAL.sub(lambda m: _ESCAPES[m.group(0)], tag.group(0)))
+            pos = tag.end()
+            repairs['escaped_tag'] = repairs.get('escaped_tag', 0) + 1
+            continue
+        else:
+            parts.append(_ESCAPES[char])
+        repairs[_REPAIR_NAMES[char]] = repairs.get(_REPAIR_NAMES[char], 0) + 1
+
+class FlowNode:
+    """Compact node record used throughout the conversion; turned into a dict only for output"""
+    __slots__ = ('id', 'type', 'value', 'children', 'parent', 'has_voice_prompt', 'transitions')
+
+    def __init__(self, node_id: str, node_type: str, value: str, has_voice_prompt: bool):
+        self.id = node_id
+        self.type = node_type
+        self.value = value
+        self.children = []
+        self.parent = None
+        self.has_voice_prompt = has_voice_prompt
+        self.transitions = {}
+
+
+class XMLToFlatArrayConverter:
+    """
+    Converts BnGModel XML into the flat node array. Conversion state lives in
+    per-call locals, so one instance can be shared across threads and asyncio tasks.
+    """
+
+    def __init__(self, cache_size: int = 128):
+        # Parsed flows serialized as JSON, keyed by digest of the raw XML string, least recently used first
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _xml_digest(xml_string: str) -> str:
+        return hashlib.sha256(xml_string.encode('utf-8')).hexdigest()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current size of the parsed-flow cache"""
+        with self._cache_lock:
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'evictions': self.cache_evictions,
+                'size': len(self._cache),
+                'max_size': self.cache_size
+            }
+
+    def invalidate(self, xml_string: Optional[str] = None) -> None:
+        """
+        Drop cached results
+        Args:
+            xml_string (str, optional): Raw XML whose entry to drop; clears the whole cache if omitted
+        """
+        digest = None if xml_string is None else self._xml_digest(xml_string)
+        with self._cache_lock:
+            if digest is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(digest, None)
+
+    def parse_xml_string_to_flat_array(self, xml_string: str) -> Dict[str, Any]:
+        """
+        Parse XML string and convert to flat array structure
+        Args:
+            xml_string (str): XML content as string
+        Returns:
+            dict: Flat array with metadata, owned by the caller (cache hits are fresh copies)
+        """
+        digest = self._xml_digest(xml_string)
+        with self._cache_lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                self._cache.move_to_end(digest)
+                self.cache_hits += 1
+        if cached is not None:
+            # The cache keeps JSON text, so a caller mutating its result cannot affect later requests
+            return json.loads(cached)
+        with self._cache_lock:
+            self.cache_misses += 1
+
+        # Parse outside the lock so concurrent requests for different flows don't serialize
+        result = self._parse_xml_string(xml_string)
+        if self.cache_size > 0:
+            serialized = json.dumps(result, separators=(',', ':'))
+            with self._cache_lock:
+                self._cache[digest] = serialized
+                self._cache.move_to_end(digest)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                    self.cache_evictions += 1
+        return result
+
+    def _parse_xml_string(self, xml_string: str) -> Dict[str, Any]:
+        logger.info(f"Creating flat_array from XM")
     
-    # Try decoding unicode escapes
-    try:
-        xml_string = xml_string.encode('utf-8').decode('unicode_escape')
-    except Exception as e:
-        logger.error(f"Unicode escape decode failed: {e}")
+        # Unescape HTML entities and unicode escapes
+        xml_string = html.unescape(xml_string)
+        xml_string = re.sub(r'\\u003c', '<', xml_string)
+        xml_string = re.sub(r'\\u003e', '>', xml_string)
+        xml_string = re.sub(r'\\u0022', '"', xml_string)
+        xml_string = xml_string.strip()
     
-    # ULTIMATE SOLUTION: Multiple robust strategies
-    strategies = [
-        # Strategy 1: Clean problematic attributes
-        lambda x: re.sub(r'xmlParamsData="[^"]*"', 'xmlParamsData=""', x),
-        # Strategy 2: Remove attributes completely
-        lambda x: re.sub(r'\s+xmlParamsData="[^"]*"', '', x),
-        # Strategy 3: Remove any attribute with problematic content
-        lambda x: re.sub(r'\s+[a-zA-Z_][a-zA-Z0-9_]*="[^"]*<[^"]*"', '', x),
-        # Strategy 4: Remove any attribute with > in value
-        lambda x: re.sub(r'\s+[a-zA-Z_][a-zA-Z0-9_]*="[^"]*>[^"]*"', '', x),
-        # Strategy 5: Remove any attribute with & in value
-        lambda x: re.sub(r'\s+[a-zA-Z_][a-zA-Z0-9_]*="[^"]*&[^"]*"', '', x),
-        # Strategy 6: Remove any attribute with quotes in value
-        lambda x: re.sub(r'\s+[a-zA-Z_][a-zA-Z0-9_]*="[^"]*"[^"]*"', '', x),
-    ]
+        # Try decoding unicode escapes
+        try:
+            xml_string = xml_string.encode('utf-8').decode('unicode_escape')
+        except Exception as e:
+            logger.error(f"Unicode escape decode failed: {e}")
     
-    # Try each strategy
-    for i, strategy in enumerate(strategies, 1):
+        # Repair problem attribute values so a single parse is enough
+        cleaned_xml, repairs = sanitize_xml_attributes(xml_string)
+        if repairs:
+            logger.info(f"XML sanitizer repairs applied: {repairs}")
         try:
-            logger.info(f"Trying strategy {i}")
-            cleaned_xml = strategy(xml_string)
             root = ET.fromstring(cleaned_xml)
-            logger.info(f"XML parsing succeeded with strategy {i}")
-            break
         except ET.ParseError as e:
-            logger.error(f"Strategy {i} failed: {e}")
-            if i == len(strategies):
-                # Last strategy failed, try lxml
-                try:
-                    from lxml import etree
-                    root = etree.fromstring(cleaned_xml)
-                    logger.info("XML parsing succeeded with lxml")
-                    break
-                except ImportError:
-                    logger.error("lxml not available")
-                except Exception as e:
-                    logger.error(f"lxml parsing failed: {e}")
-                    raise ValueError(f"Failed to parse XML after all attempts: {e}")
-    
-    root_element = root.find('root')
-    if root_element is None:
-        logger.error("No 'root' element found in XML")
-        raise ValueError("No 'root' element found in XML")
-    
-    # Rest of your existing code...
-    self.nodes = {}
-    self.connections = {}
-    self.node_types = {}
-    
-    for mx_cell in root_element.findall('mxCell'):
-        cell_id = mx_cell.get('id')
-        cell_type = mx_cell.get('type', 'Unknown')
-        cell_value = mx_cell.get('value', '')
-        promptfiles = []
-        if cell_type == 'Navigation':
-            mx_params = mx_cell.find('mxParams')
-            if mx_params is not None:
-                for mx_param in mx_params.findall('mxParam'):
-                    promptfile = mx_param.get('promptfile')
-                    if promptfile:
-                        promptfiles.append(promptfile)
-        if cell_id:
-            self.nodes[cell_id] = {
-                'id': cell_id,
-                'type': cell_type,
-                'value': cell_value,
-                'children': [],
-                'parent': None,
-                'promptfiles': promptfiles
-            }
-            self.node_types[cell_id] = cell_type
+            logger.error(f"XML parsing failed after sanitizing: {e}")
+            raise ValueError(f"Failed to parse XML: {e}")
     
-    for mx_cell in root_element.findall('mxCell'):
-        source = mx_cell.get('source')
-        target = mx_cell.get('target')
-        if source and target:
-            if source not in self.connections:
-                self.connections[source] = []
-            self.connections[source].append(target)
+        root_element = root.find('root')
+        if root_element is None:
+            logger.error("No 'root' element found in XML")
+            raise ValueError("No 'root' element found in XML")
     
-    self._build_parent_child_relationships()
-    flat_array = self._convert_to_flat_array()
-    metadata = self._generate_metadata()
-    return {
-        'metadata': metadata,
-        'nodes': flat_array
-    }
-
-    def parse_xml_to_flat_array(self, xml_file_path: str) -> Dict[str, Any]:
+        nodes, connections = self._load_mx_cells(root_element.findall('mxCell'))
+        return self._build_flat_result(nodes, connections)
+
+    def parse_xml_to_flat_array(self, xml_file_path: str, streaming: bool = False) -> Dict[str, Any]:
         """
         Parse XML file and convert to flat array structure
         Args:
             xml_file_path (str): Path to XML file
+            streaming (bool): Parse incrementally, keeping only the attributes
+                the conversion uses and freeing each cell once read. The file must
+                already be well-formed: streaming skips the unescaping and attribute
+                repairs of the string path
         Returns:
             dict: Flat array with metadata
+        Raises:
+            ValueError: If the XML cannot be parsed or has no 'root' element
         """
+        if streaming:
+            logger.info(f"Creating flat_array from {xml_file_path} in streaming mode")
+            try:
+                nodes, connections = self._load_mx_cells(self._iter_root_mx_cells(xml_file_path))
+            except ET.ParseError as e:
+                logger.error(f"XML parsing failed in streaming mode: {e}")
+                raise ValueError(f"Failed to parse XML: {e}")
+            return self._build_flat_result(nodes, connections)
         with open(xml_file_path, 'r', encoding='utf-8') as f:
             xml_string = f.read()
         return self.parse_xml_string_to_flat_array(xml_string)
 
-    def _build_parent_child_relationships(self):
-        for source, targets in self.connections.items():
-            if source in self.nodes:
-                self.nodes[source]['children'] = targets
-        for source, targets in self.connections.items():
-            for target in targets:
-                if target in self.nodes:
-                    self.nodes[target]['parent'] = source
+    def _iter_root_mx_cells(self, xml_file_path: str):
+        """Yield the mxCell children of the <root> element one at a time, clearing each after use"""
+        parents = []
+        found_root = False
+        for event, elem in ET.iterparse(xml_file_path, events=('start', 'end')):
+            if event == 'start':
+                parents.append(elem)
+                continue
+            parents.pop()
+            if elem.tag == 'root':
+                found_root = True
+            elif elem.tag == 'mxCell' and parents and parents[-1].tag == 'root':
+                yield elem
+                elem.clear()
+                parents[-1].remove(elem)
+        if not found_root:
+            logger.error("No 'root' element found in XML")
+            raise ValueError("No 'root' element found in XML")
+
+    def _load_mx_cells(self, mx_cells):
+        """
+        Collect (nodes, connections) from mxCell elements in a single pass; connections maps
+        each source to its (target, label) edges in document order
+        """
+        nodes = {}
+        connections = {}
+
+        for mx_cell in mx_cells:
+            cell_id = mx_cell.get('id')
+            # Type strings repeat across every cell, so share one copy of each
+            cell_type = sys.intern(mx_cell.get('type', 'Unknown'))
+            cell_value = mx_cell.get('value', '')
+            has_voice_prompt = False
+            if cell_type == 'Navigation':
+                mx_params = mx_cell.find('mxParams')
+                if mx_params is not None:
+                    for mx_param in mx_params.findall('mxParam'):
+                        promptfile = mx_param.get('promptfile')
+                        if promptfile and '_VOICEPROMPT.wav' in promptfile:
+                            has_voice_prompt = True
+            if cell_id:
+                nodes[cell_id] = FlowNode(cell_id, cell_type, cell_value, has_voice_prompt)
+
+            source = mx_cell.get('source')
+            target = mx_cell.get('target')
+            if source and target:
+                if source not in connections:
+                    connections[source] = []
+                connections[source].append((target, cell_value))
 
-    def _convert_to_flat_array(self) -> List[Dict[str, Any]]:
+        return nodes, connections
+
+    def _build_flat_result(self, nodes: Dict[str, FlowNode],
+                           connections: Dict[str, List[Tuple[str, str]]]) -> Dict[str, Any]:
+        self._build_parent_child_relationships(nodes, connections)
+        flat_array = self._convert_to_flat_array(nodes)
+        metadata = self._generate_metadata(nodes, connections)
+        return {
+            'metadata': metadata,
+            'nodes': flat_array,
+            'route_table': build_route_table(flat_array, connections)
+        }
+
+    def _build_parent_child_relationships(self, nodes: Dict[str, FlowNode],
+                                          connections: Dict[str, List[Tuple[str, str]]]):
+        for source, edges in connections.items():
+            if source in nodes:
+                nodes[source].children = [target for target, _ in edges]
+                nodes[source].transitions = build_transitions((label, target) for target, label in edges)
+        for source, edges in connections.items():
+            for target, _ in edges:
+                # A self-loop (e.g. '*' to repeat a menu) never makes a node its own parent
+                if target in nodes and target != source:
+                    nodes[target].parent = source
+
+    def _convert_to_flat_array(self, nodes: Dict[str, FlowNode]) -> List[Dict[str, Any]]:
         flat_array = []
-        NON_SKIPPABLE_TYPES = get_non_skippable_types()
-        for node_id, node_data in self.nodes.items():
-            node_type = node_data['type']
-            node_value = node_data['value']
-            # Determine if node is non-skippable
-            # logger.info(f"Node {node_id} (Navigation) data: {node_data}")
-
-            is_skippable = get_is_skippable(node_type)
-            if node_type == "Navigation":
-                promptfiles = node_data.get('promptfiles', [])
-                is_skippable = any('_VOICEPROMPT.wav' in pf for pf in promptfiles)
-                
-              
-            land_before = get_land_before(node_type)
-            flat_node = {
-                'id': node_id,
-                'type': node_type,
-                'value': node_value,
-                'children': node_data['children'],
-                'parent': node_data['parent'],
+        # Skippable/land_before depend only on the type, so resolve each type once
+        type_flags = {}
+        for node in nodes.values():
+            flags = type_flags.get(node.type)
+            if flags is None:
+                flags = type_flags[node.type] = (get_is_skippable(node.type), get_land_before(node.type))
+            is_skippable, land_before = flags
+            if node.type == "Navigation":
+                is_skippable = node.has_voice_prompt
+
+            flat_array.append({
+                'id': node.id,
+                'type': node.type,
+                'value': node.value,
+                'children': node.children,
+                'parent': node.parent,
                 'isSkippable': is_skippable,
-                'land_before': land_before
-            }
-            # logger.info(f"Node {node_id} (Navigation) flat_node: {flat_node}")
-            flat_array.append(flat_node)
+                'land_before': land_before,
+                'transitions': node.transitions
+            })
         flat_array.sort(key=lambda x: int(x['id']) if x['id'].isdigit() else x['id'])
         return flat_array
 
-    def _generate_metadata(self) -> Dict[str, Any]:
-        total_nodes = len(self.nodes)
-        root_nodes = sum(1 for node in self.nodes.values() if node['parent'] is None)
-        total_connections = sum(len(targets) for targets in self.connections.values())
+    def _generate_metadata(self, nodes: Dict[str, FlowNode],
+                           connections: Dict[str, List[Tuple[str, str]]]) -> Dict[str, Any]:
+        total_nodes = len(nodes)
+        root_nodes = sum(1 for node in nodes.values() if node.parent is None)
+        total_connections = sum(len(edges) for edges in connections.values())
         type_counts = {}
-        for node_type in self.node_types.values():
-            type_counts[node_type] = type_counts.get(node_type, 0) + 1
+        for node in nodes.values():
+            type_counts[node.type] = type_counts.get(node.type, 0) + 1
         return {
             'source_xml': 'xml.xml',
             'total_nodes': total_nodes,